@@ -0,0 +1 @@
+"""Offline benchmarks of the addon, see run.py."""
@@ -0,0 +1,247 @@
+"""Synthetic answers of every endpoint the Mediaset client calls.
+
+The answers have the shape of the real ones with only the fields the addon
+reads, plus the usual amount of text, so the parsing and the listings cost
+about the same. ``answer`` is called by the stub server with the original
+host, path and query of each request; the number of elements of a page
+follows the ``hitsPerPage`` or ``range`` asked, so the benchmarks can try
+different page sizes.
+"""
+import json
+import time
+try:
+    from urllib.parse import parse_qs
+except ImportError:
+    from urlparse import parse_qs
+
+PAGES = 3
+CHANNELS = 12
+SMIL_REFS = 12
+LOREM = ('Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod tempor '
+         'incididunt ut labore et dolore magna aliqua. ')
+SECTIONS = ('CWFILMACTION', 'CWFILMCOMEDY', 'CWFILMDRAMATIC', 'CWFICTIONPOLICE',
+            'CWPROGTVPRIME', 'CWPROGTVTALK', 'CWKIDSCARTOONITO', 'CWDOCUSPAZIO')
+
+
+def _thumbs(name, kinds=('image_vertical-264x396', 'image_header_poster-1440x630',
+                         'brand_logo-210x210', 'brand_cover-1440x513')):
+    return {k: {'url': 'https://static2.mediasetplay.mediaset.it/{}/{}.jpg'.format(name, k),
+                'width': 264, 'height': 396, 'title': k} for k in kinds}
+
+
+def program(i):
+    return {
+        'guid': 'G{:06d}'.format(i),
+        'title': 'Episodio {}'.format(i),
+        'description': LOREM * 3,
+        'shortDescription': LOREM,
+        'mediasetprogram$brandTitle': 'Programma {}'.format(i // 10),
+        'mediasetprogram$brandId': 'B{:06d}'.format(i // 10),
+        'mediasetprogram$subBrandId': 'SB{:06d}'.format(i // 10),
+        'mediasetprogram$subBrandDescription': 'Puntate intere',
+        'mediasetprogram$genres': ['Intrattenimento', 'Varieta'],
+        'mediasetprogram$duration': 1500 + i,
+        'programType': 'episode',
+        'tvSeasonNumber': 1,
+        'tvSeasonEpisodeNumber': i,
+        'year': 2024,
+        'credits': [{'creditType': 'actor' if c else 'director',
+                     'personName': 'Persona {}'.format(c)} for c in range(4)],
+        'tags': [{'scheme': 'genre', 'title': 'Show'}],
+        'thumbnails': _thumbs('program/{}'.format(i)),
+        'media': [{'pid': 'P{:06d}'.format(i), 'publicUrl': 'https://link.theplatform.eu/'
+                   's/PR1GhC/P{:06d}'.format(i)}],
+        'mediasetprogram$hasVod': True,
+    }
+
+
+def series(i):
+    return {
+        'seriesId': 'S{:06d}'.format(i),
+        'title': 'Serie {}'.format(i),
+        'description': LOREM * 2,
+        'mediasetprogram$brandVerticalSiteCMS': 'fiction' if i % 2 else 'programmi',
+        'mediasettvseason$genres': ['Fiction'],
+        'thumbnails': _thumbs('series/{}'.format(i)),
+    }
+
+
+def season(i, seriesId):
+    return {
+        'mediasettvseason$brandId': 'B{}{:02d}'.format(seriesId, i),
+        'mediasettvseason$displaySeason': 'Stagione {}'.format(i + 1),
+        'title': 'Stagione {}'.format(i + 1),
+        'mediasettvseason$shortDescription': LOREM,
+        'thumbnails': _thumbs('season/{}'.format(i)),
+    }
+
+
+def listing(i, start, length, callSign):
+    return {
+        'startTime': start,
+        'endTime': start + length - 1,
+        'mediasetlisting$epgTitle': 'Programma in onda {}'.format(i),
+        'mediasetlisting$restartAllowed': i % 2 == 0,
+        'restartUrl': 'https://link.theplatform.eu/s/PR1GhC/R{}{}'.format(callSign, i),
+        'program': program(i),
+    }
+
+
+def tuning(callSign):
+    return {'urn:theplatform:tv:location:any': [
+        {'format': 'application/x-mpegURL', 'releasePids': ['L' + callSign]},
+        {'format': 'application/dash+xml', 'releasePids': ['D' + callSign]}]}
+
+
+def station(i):
+    callSign = 'C{:02d}'.format(i)
+    return {'callSign': callSign, 'title': 'Canale {}'.format(i),
+            'tuningInstruction': tuning(callSign), 'mediasetstation$eventBased': False,
+            'thumbnails': _thumbs('channel/{}'.format(i), ('channel_logo-100x100',))}
+
+
+def smil(pid, refs=SMIL_REFS, protected=None):
+    """SMIL with ``refs`` streams, the ``protected`` ones first like the real answers.
+
+    Half of the streams are protected by default, all of them for a pid
+    starting with W.
+    """
+    if protected is None:
+        protected = refs if pid.startswith('W') else refs // 2
+    exp = int(time.time()) + 6 * 60 * 60
+    body = []
+    for r in range(refs):
+        drm = r < protected
+        kind, ext = [('application/dash+xml', 'mpd'), ('video/mp4', 'mp4'),
+                     ('application/x-mpegURL', 'm3u8')][r % 3]
+        body.append(
+            '<switch><ref src="https://vod.mediaset.net/{pid}/{r}.{ext}?hdnts=exp={exp}~acl=*" '
+            'title="{pid}" type="{kind}" height="{height}"{security}>'
+            '<param name="trackingData" value="aid=2702976343|pid={pid}|cid={r}"/>'
+            '</ref></switch>'.format(pid=pid, r=r, ext=ext, exp=exp, kind=kind,
+                                     height=(360, 720, 1080)[r % 3],
+                                     security=' security="commonEncryption"' if drm else ''))
+    return ('<?xml version="1.0" encoding="UTF-8"?>'
+            '<smil xmlns="http://www.w3.org/2005/SMIL21/Language"><head>'
+            '<meta base="https://vod.mediaset.net"/></head><body><seq>{}</seq></body></smil>'
+            ).format(''.join(body))
+
+
+def _page(query, default=20):
+    # (first element, elements) asked by the request
+    if 'range' in query:
+        first, _, last = query['range'].partition('-')
+        return int(first) - 1, int(last) - int(first) + 1
+    size = int(query.get('hitsPerPage', default))
+    return (int(query.get('page', 1)) - 1) * size, size
+
+
+def _mediaset(entries, more, key='hasMore'):
+    return {'isOk': True, 'response': {key: more, 'entries': entries}}
+
+
+def _accedo(ids):
+    entries = []
+    for eid in ids:
+        if eid.startswith('C-'):
+            root, _, k = eid[2:].rpartition('-')
+            entries.append({'_meta': {'id': eid}, 'title': 'Sezione {}'.format(k),
+                            'uxReference': SECTIONS[int(k) % len(SECTIONS)]})
+        else:
+            entries.append({'_meta': {'id': eid}, 'title': 'Menu',
+                            'components': ['C-{}-{}'.format(eid, k) for k in range(8)]})
+    return {'entries': entries}
+
+
+def _reco(query):
+    first, size = _page(query, 24)
+    page = first // size + 1
+    more = page < PAGES
+    if query.get('uxReference') and not query.get('shortId') and size == 15:
+        blocks = [{'title': 'Blocco {}'.format(b), '_viewAll': 'V{}'.format(b)}
+                  for b in range(6)]
+    else:
+        blocks = [{'title': 'Blocco', 'items': [program(first + i) for i in range(size)]}]
+    return {'isOk': True, 'response': {'pagination': {'hasNextPage': more},
+                                       'blocks': blocks}}
+
+
+def _guide(query):
+    start, _, finish = query['byListingTime'].partition('~')
+    start, finish = int(start), int(finish)
+    half = 30 * 60 * 1000
+    listings = [listing(i, t, half, query.get('byCallSign', ''))
+                for i, t in enumerate(range(start - start % half, finish, half))]
+    return _mediaset([{'listings': listings}], False)
+
+
+def _feed(path, query):
+    if 'mediaset-prod-tv-seasons' in path:
+        seriesId = query['bySeriesId']
+        # series ending with 1 have a single season, like most of the shows
+        seasons = 1 if seriesId.endswith('1') else 3
+        return {'entries': [season(i, seriesId) for i in range(seasons)]}
+    if 'mediaset-prod-all-brands' in path:
+        brandId = query['byCustomValue'].rpartition('{')[2].rstrip('}')
+        return {'entries': [{'title': 'Brand', 'description': LOREM},
+                            {'mediasetprogram$subBrandId': 'SB' + brandId,
+                             'description': 'Puntate intere', 'title': 'Puntate intere'}]}
+    if '/guid/' in path:
+        return {'media': [{'pid': 'P' + path.rpartition('/')[2]}]}
+    if 'mediaset-prod-all-programs' in path:
+        first, size = _page(query)
+        return {'entries': [program(first + i) for i in range(size)]}
+    if 'mediaset-prod-all-stations' in path:
+        return {'entries': [station(i) for i in range(CHANNELS)]}
+    if 'mediaset-prod-all-listings' in path:
+        now = int(time.time() * 1000)
+        return {'entries': [{'guid': 'C{:02d}'.format(i), 'title': 'Canale {}'.format(i),
+                             'listings': [listing(i, now - 600000, 3600000,
+                                                  'C{:02d}'.format(i))]}
+                            for i in range(CHANNELS)]}
+    return None
+
+
+def answer(method, host, path, query, body=None):
+    """Return ``(status, headers, body)`` for a request, ``None`` if it's unknown."""
+    query = {k: v[-1] for k, v in parse_qs(query, keep_blank_values=True).items()}
+    if method == 'OPTIONS':
+        return 200, {}, b''
+    if host == 'api.one.accedo.tv':
+        if path == '/session':
+            data = {'sessionKey': 'session'}
+        else:
+            data = _accedo(query['id'].split(','))
+    elif host == 'login.mediaset.it':
+        return 200, {}, ('gigya.callback({});'.format(json.dumps(
+            {'errorCode': 0, 'UID': 'uid', 'UIDSignature': 'sig',
+             'signatureTimestamp': str(int(time.time()))}))).encode('utf-8')
+    elif '/idm/' in path:
+        return 200, {'t-apigw': 'apigw', 't-cts': 'cts'}, json.dumps(
+            {'isOk': True, 'response': {'traceCid': 'trace', 'cwId': 'cw'}}).encode('utf-8')
+    elif '/azlisting/' in path or '/cataloguelisting/' in path:
+        first, size = _page(query)
+        data = _mediaset([series(first + i) for i in range(size)], first // size + 1 < PAGES)
+    elif '/search/' in path:
+        first, size = _page(query)
+        data = _mediaset([program(first + i) for i in range(size)], first // size + 1 < PAGES)
+    elif '/reco/' in path:
+        data = _reco(query)
+    elif '/allListingFeedEpg/' in path:
+        data = _guide(query)
+    elif '/nownext/' in path:
+        callSign = path.rpartition('/')[2].split('.')[0]
+        now = int(time.time() * 1000)
+        data = {'isOk': True, 'response': {
+            'currentListing': listing(0, now - 600000, 3600000, callSign),
+            'tuningInstruction': tuning(callSign)}}
+    elif host == 'link.theplatform.eu':
+        return 200, {'Content-Type': 'application/smil+xml'}, smil(
+            path.rpartition('/')[2]).encode('utf-8')
+    elif host == 'feed.entertainment.tv.theplatform.eu':
+        data = _feed(path, query)
+    else:
+        data = None
+    if data is None:
+        return None
+    return 200, {'Content-Type': 'application/json'}, json.dumps(data).encode('utf-8')
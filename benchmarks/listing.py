@@ -0,0 +1,75 @@
+"""Benchmark of handing a listing to kodi one item at a time or all together.
+
+Builds the same listing of fixture programs with ``kodiutils.addListItem``
+for each item and with ``DirectoryItems``, on the stub ``xbmcplugin`` that
+counts the calls and spends ``--cost`` microseconds in each one, the price
+of crossing into kodi::
+
+    python -m benchmarks.listing --items 50 500 2000 --cost 20
+"""
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (os.path.join(ROOT, 'tests', 'stubs'), ROOT):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import xbmcplugin  # noqa: E402 pylint: disable=import-error,wrong-import-position
+from phate89lib import kodiutils  # noqa: E402 pylint: disable=wrong-import-position
+from benchmarks import fixtures  # noqa: E402 pylint: disable=wrong-import-position
+from resources.main import DirectoryItems  # noqa: E402 pylint: disable=wrong-import-position
+from resources.mediaset_datahelper import ProgramItem  # noqa: E402 pylint: disable=wrong-import-position
+
+
+def _entries(count):
+    for i in range(count):
+        item = ProgramItem(fixtures.program(i))
+        yield item.infos['title'], {'mode': 'video', 'pid': 'P{}'.format(i)}, item.infos, item.arts
+
+
+def per_item(entries):
+    for label, params, infos, arts in entries:
+        kodiutils.addListItem(label, params, videoInfo=infos, arts=arts, isFolder=False)
+    kodiutils.endScript()
+
+
+def batched(entries):
+    items = DirectoryItems()
+    for label, params, infos, arts in entries:
+        items.add(label, params, videoInfo=infos, arts=arts, isFolder=False)
+    items.end()
+
+
+def measure(build, count, cost=0.0):
+    """Return ``(seconds, calls into xbmcplugin)`` to list ``count`` items."""
+    sys.argv = ['plugin://plugin.video.videomediaset/', '1', '']
+    entries = list(_entries(count))
+    xbmcplugin.reset()
+    xbmcplugin.COST = cost
+    try:
+        start = time.perf_counter()
+        build(entries)
+        return time.perf_counter() - start, len(xbmcplugin.CALLS)
+    finally:
+        xbmcplugin.COST = 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, nargs='+', default=[50, 500, 2000])
+    parser.add_argument('--cost', type=float, default=20, help='microseconds of each call')
+    args = parser.parse_args(argv)
+    print('{:>6} {:>14} {:>8} {:>14} {:>8}'.format('items', 'per item ms', 'calls',
+                                                   'batched ms', 'calls'))
+    for count in args.items:
+        single = measure(per_item, count, args.cost / 1e6)
+        batch = measure(batched, count, args.cost / 1e6)
+        print('{:>6} {:>14.1f} {:>8} {:>14.1f} {:>8}'.format(
+            count, single[0] * 1000, single[1], batch[0] * 1000, batch[1]))
+
+
+if __name__ == '__main__':
+    main()
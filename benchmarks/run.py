@@ -0,0 +1,176 @@
+"""Offline benchmark of every view of the plugin.
+
+Drives ``KodiMediaset.main()`` for each mode with the kodi modules of
+tests/stubs, against the local stub of the Mediaset apis, and reports wall
+time, requests, bytes downloaded and peak memory of each one. Run it from
+the root of the repository::
+
+    python -m benchmarks.run --latency 80 --jitter 30 --items 100
+
+The response cache is off unless ``--cache`` is given, and the local
+stores (saved streams, guide, remembered seasons) are emptied before every
+run, so each one makes the requests of a first visit. Only the keys of the
+apis are kept, they are asked once in a warm up run.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import namedtuple
+try:
+    from urllib.parse import urlencode
+except ImportError:
+    from urllib import urlencode
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (os.path.join(ROOT, 'tests', 'stubs'), ROOT):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import xbmcaddon  # noqa: E402 pylint: disable=import-error,wrong-import-position
+import xbmcplugin  # noqa: E402 pylint: disable=import-error,wrong-import-position
+from phate89lib import kodiutils, rutils, staticutils  # noqa: E402 pylint: disable=wrong-import-position
+from benchmarks.stubserver import StubServer  # noqa: E402 pylint: disable=wrong-import-position
+
+PLUGIN = 'plugin://plugin.video.videomediaset/'
+
+Result = namedtuple('Result', ['mode', 'seconds', 'requests', 'bytes', 'peak', 'items',
+                               'resolved'])
+
+
+def modes():
+    """``(name, params)`` of the views measured, at least one for each mode."""
+    today = staticutils.get_timestamp_midnight()
+    return (
+        ('root', {}),
+        ('programmi', {'mode': 'programmi'}),
+        ('programmi all', {'mode': 'programmi', 'all': 'true'}),
+        ('fiction', {'mode': 'fiction'}),
+        ('fiction all', {'mode': 'fiction', 'all': 'true'}),
+        ('film', {'mode': 'film'}),
+        ('film all', {'mode': 'film', 'all': 'true'}),
+        ('kids', {'mode': 'kids'}),
+        ('kids all', {'mode': 'kids', 'all': 'true'}),
+        ('documentari', {'mode': 'documentari'}),
+        ('documentari all', {'mode': 'documentari', 'all': 'true'}),
+        ('tutto', {'mode': 'tutto'}),
+        ('tutto lettere', {'mode': 'tutto', 'all': 'true'}),
+        ('tutto lettera', {'mode': 'tutto', 'all': 'true', 'letter': 'a'}),
+        ('tutto tutti', {'mode': 'tutto', 'all': 'false', 'letter': 'all'}),
+        ('cerca', {'mode': 'cerca'}),
+        ('cerca clip', {'mode': 'cerca', 'type': 'clip', 'search': 'test'}),
+        ('sezione', {'mode': 'sezione', 'id': 'CWFILMACTION'}),
+        ('sezioneV2 code', {'mode': 'sezioneV2', 'code': 'filmPiuVisti24H'}),
+        ('sezioneV2 id', {'mode': 'sezioneV2', 'id': 'V1'}),
+        ('programma series', {'mode': 'programma', 'series_id': 'S000001'}),
+        ('programma seasons', {'mode': 'programma', 'series_id': 'S000002'}),
+        ('programma brand', {'mode': 'programma', 'brand_id': 'B000001'}),
+        ('programma videos', {'mode': 'programma', 'sub_brand_id': 'SB000001'}),
+        ('canali_live', {'mode': 'canali_live'}),
+        ('live guid', {'mode': 'live', 'guid': 'C01'}),
+        ('live id', {'mode': 'live', 'id': 'LC01'}),
+        ('guida_tv', {'mode': 'guida_tv'}),
+        ('guida_tv week', {'mode': 'guida_tv', 'id': 'C01', 'week': str(today)}),
+        ('guida_tv day', {'mode': 'guida_tv', 'id': 'C01', 'day': str(today)}),
+        ('video pid', {'mode': 'video', 'pid': 'P000001'}),
+        ('video guid', {'mode': 'video', 'guid': 'G000001'}),
+        ('video drm', {'mode': 'video', 'pid': 'W000001'}),
+        ('diagnostics', {'mode': 'diagnostics'}),
+    )
+
+
+def invoke(params):
+    """Run the plugin once like kodi does for the url of ``params``."""
+    from resources.main import KodiMediaset
+    sys.argv = [PLUGIN, '1', '?' + urlencode(params) if params else '']
+    xbmcplugin.reset()
+    KodiMediaset().main()
+
+
+def clean(profile, cache):
+    # everything but the api keys, and the response cache when it's on
+    keep = ('keys.json', 'cache.db', 'cache.db-wal', 'cache.db-shm') if cache else ('keys.json',)
+    for name in os.listdir(profile):
+        path = os.path.join(profile, name)
+        if name not in keep:
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)
+
+
+def measure(name, params, server, repeat=1, cache=False):
+    invoke(params)  # warm up: api keys and imports
+    times = []
+    for _ in range(repeat):
+        clean(xbmcaddon.PROFILE, cache)
+        server.reset()
+        start = time.time()
+        invoke(params)
+        times.append(time.time() - start)
+    requests, size = server.requests, server.bytes
+    clean(xbmcaddon.PROFILE, cache)
+    tracemalloc.start()
+    try:
+        invoke(params)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    times.sort()
+    return Result(name, times[len(times) // 2], requests, size, peak, len(xbmcplugin.ITEMS),
+                  bool(xbmcplugin.RESOLVED and xbmcplugin.RESOLVED[-1][0]))
+
+
+def run(latency=0.0, jitter=0.0, items=50, repeat=1, cache=False, only=None):
+    """Measure the modes whose name contains ``only``, all of them when None."""
+    profile = tempfile.mkdtemp(prefix='videomediaset-bench-')
+    xbmcaddon.PROFILE = profile
+    kodiutils.SETTINGS.update({'itemsperpage': str(items), 'cachesize': '50' if cache else '0',
+                               'email': 'user@example.com', 'password': 'password'})
+    results = []
+    try:
+        with StubServer(latency, jitter) as server:
+            server.install(rutils.RUtils.SESSION)
+            for name, params in modes():
+                if only and only not in name:
+                    continue
+                results.append(measure(name, params, server, repeat, cache))
+    finally:
+        shutil.rmtree(profile, ignore_errors=True)
+    return results
+
+
+def report(results, out=sys.stdout):
+    out.write('{:<20} {:>9} {:>9} {:>10} {:>9} {:>6}\n'.format(
+        'mode', 'ms', 'requests', 'KB', 'peak MB', 'items'))
+    for r in results:
+        out.write('{:<20} {:>9.1f} {:>9} {:>10.1f} {:>9.2f} {:>6}\n'.format(
+            r.mode, r.seconds * 1000, r.requests, r.bytes / 1024.0, r.peak / 1024.0 / 1024.0,
+            r.items if not r.resolved else 'play'))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--latency', type=float, default=0, help='ms added to every answer')
+    parser.add_argument('--jitter', type=float, default=0, help='random ms +/- on the latency')
+    parser.add_argument('--items', type=int, default=50, help='items per page setting')
+    parser.add_argument('--repeat', type=int, default=3, help='runs of each mode, the median '
+                        'is reported')
+    parser.add_argument('--cache', action='store_true', help='keep the response cache on')
+    parser.add_argument('--mode', help='only the modes whose name contains this')
+    parser.add_argument('--json', help='also save the results to this file')
+    args = parser.parse_args(argv)
+    results = run(args.latency / 1000.0, args.jitter / 1000.0, args.items, args.repeat,
+                  args.cache, args.mode)
+    report(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump([r._asdict() for r in results], f, indent=1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Benchmark of picking the stream of a large SMIL document.
+
+Compares ``smil.resolve``, which parses incrementally and stops at the
+first stream nothing later can beat, with parsing the whole document and
+ranking every stream. The documents have ``--refs`` streams, none, half
+or all of them protected and listed first::
+
+    python -m benchmarks.smil --refs 12 200 2000 --repeat 20
+"""
+import argparse
+import os
+import sys
+import time
+import xml.etree.ElementTree as ET
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from benchmarks import fixtures  # noqa: E402 pylint: disable=wrong-import-position
+from resources.lib import smil  # noqa: E402 pylint: disable=wrong-import-position
+
+
+def full(text, policy):
+    """The stream ``resolve`` picks, parsing the whole document first."""
+    root = ET.fromstring(text)
+    candidates = [c for c in (smil._candidate(ref) for ref in root.iter(smil.SMIL_NS + 'ref'))
+                  if c.url]
+    return min(candidates, key=policy.rank) if candidates else None
+
+
+def early(text, policy):
+    return smil.resolve(text, policy)[0]
+
+
+def documents(refs):
+    """``(name, text)`` of the documents measured with ``refs`` streams."""
+    return [(name, fixtures.smil('P000001', refs, protected).encode('utf-8'))
+            for name, protected in (('clear', 0), ('half drm', refs // 2), ('drm', refs))]
+
+
+def measure(parse, text, policy, repeat=1):
+    """Return ``(best seconds, stream picked)`` of ``repeat`` parses of ``text``."""
+    best, cand = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cand = parse(text, policy)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, cand
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--refs', type=int, nargs='+', default=[12, 200, 2000])
+    parser.add_argument('--repeat', type=int, default=20, help='parses of each document, the '
+                        'best is reported')
+    args = parser.parse_args(argv)
+    policy = smil.SmilPolicy()
+    print('{:>6} {:<10} {:>8} {:>10} {:>10}'.format('refs', 'document', 'KB', 'full ms',
+                                                    'early ms'))
+    for refs in args.refs:
+        for name, text in documents(refs):
+            whole, expected = measure(full, text, policy, args.repeat)
+            part, cand = measure(early, text, policy, args.repeat)
+            assert cand == expected
+            print('{:>6} {:<10} {:>8.1f} {:>10.3f} {:>10.3f}'.format(
+                refs, name, len(text) / 1024.0, whole * 1000, part * 1000))
+
+
+if __name__ == '__main__':
+    main()
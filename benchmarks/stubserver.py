@@ -0,0 +1,132 @@
+"""Local http server answering the Mediaset requests with the fixtures.
+
+``StubServer.install`` mounts an adapter on a requests session that sends
+every https request to the server, with the original host as the first
+part of the path, so the client code runs unchanged. Every answer is
+delayed by ``latency`` seconds plus a random ``jitter``, to see how the
+views behave on a real connection.
+"""
+import random
+import threading
+import time
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+    from urllib.parse import urlsplit
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+    from urlparse import urlsplit
+from requests.adapters import HTTPAdapter
+
+from benchmarks import fixtures
+
+
+class _Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # headers and body are written apart, don't let the delayed ack slow them
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def __answer(self):
+        stub = self.server.stub
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else None
+        host, _, rest = self.path.lstrip('/').partition('/')
+        path, _, query = ('/' + rest).partition('?')
+        res = fixtures.answer(self.command, host, path, query, body)
+        status, headers, content = res if res is not None else (404, {}, b'')
+        stub.wait()
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(content)
+        stub.record(self.command, host + path, status, len(content))
+
+    do_GET = do_POST = do_OPTIONS = do_HEAD = __answer
+
+
+class _StubAdapter(HTTPAdapter):
+
+    def __init__(self, base):
+        HTTPAdapter.__init__(self)
+        self.base = base
+
+    def send(self, request, **kwargs):
+        parts = urlsplit(request.url)
+        request.url = '{}/{}{}{}'.format(self.base, parts.netloc, parts.path,
+                                         '?' + parts.query if parts.query else '')
+        kwargs['verify'] = False
+        return HTTPAdapter.send(self, request, **kwargs)
+
+
+class StubServer(object):
+    """Stub of the Mediaset apis on a free local port.
+
+    ``requests`` and ``bytes`` count what was served since the last
+    ``reset``, ``log`` keeps ``(method, url, status, bytes)`` of every answer.
+    """
+
+    def __init__(self, latency=0.0, jitter=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.log = []
+        self.__random = random.Random(seed)
+        self.__lock = threading.Lock()
+        self.__server = _Server(('127.0.0.1', 0), _Handler)
+        self.__server.stub = self
+        self.__thread = None
+
+    @property
+    def url(self):
+        return 'http://127.0.0.1:{}'.format(self.__server.server_address[1])
+
+    @property
+    def requests(self):
+        return len(self.log)
+
+    @property
+    def bytes(self):
+        return sum(r[3] for r in self.log)
+
+    def wait(self):
+        with self.__lock:
+            delay = self.latency + self.__random.uniform(-self.jitter, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def record(self, method, url, status, size):
+        with self.__lock:
+            self.log.append((method, url, status, size))
+
+    def reset(self):
+        with self.__lock:
+            self.log = []
+
+    def install(self, session):
+        session.mount('https://', _StubAdapter(self.url))
+
+    def start(self):
+        self.__thread = threading.Thread(target=self.__server.serve_forever)
+        self.__thread.daemon = True
+        self.__thread.start()
+        return self
+
+    def stop(self):
+        self.__server.shutdown()
+        self.__server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
@@ -0,0 +1,128 @@
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+try:
+    from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+except ImportError:
+    from urlparse import urlsplit, urlunsplit, parse_qsl
+    from urllib import urlencode
+
+
+CachedResponse = namedtuple('CachedResponse', ['body', 'expires', 'etag', 'modified'])
+
+
+def normalize_url(url):
+    parts = urlsplit(url)
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((parts.scheme, parts.netloc.lower(), parts.path, query, ''))
+
+
+class ResponseCache(object):
+    """Persistent response cache shared by every plugin invocation.
+
+    Bodies are stored in SQLite keyed by normalized url with an expiry
+    timestamp. When the total size goes over ``maxsize`` bytes the least
+    recently used entries are removed. SQLite locking makes it safe to use
+    from several plugin processes at the same time, a lock serializes the
+    threads of a single process on the shared connection.
+
+    Expired entries are kept until evicted together with their ``ETag`` and
+    ``Last-Modified`` validators, so they can be revalidated instead of
+    downloaded again.
+    """
+
+    SCHEMA_VERSION = 1
+
+    def __init__(self, path, maxsize):
+        self.path = path
+        self.maxsize = maxsize
+        self.__conn = None
+        self.__lock = threading.RLock()
+
+    def __connect(self):
+        if self.__conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            if conn.execute('PRAGMA user_version').fetchone()[0] != self.SCHEMA_VERSION:
+                conn.execute('DROP TABLE IF EXISTS responses')
+                conn.execute('PRAGMA user_version = {}'.format(self.SCHEMA_VERSION))
+            conn.execute('CREATE TABLE IF NOT EXISTS responses ('
+                         'url TEXT PRIMARY KEY, body BLOB NOT NULL, size INTEGER NOT NULL, '
+                         'expires REAL NOT NULL, accessed REAL NOT NULL, '
+                         'etag TEXT, modified TEXT)')
+            conn.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)')
+            self.__conn = conn
+        return self.__conn
+
+    def get(self, url, stale=False):
+        key = normalize_url(url)
+        now = time.time()
+        with self.__lock:
+            try:
+                conn = self.__connect()
+                row = conn.execute('SELECT body, expires, etag, modified FROM responses WHERE url = ?',
+                                   (key,)).fetchone()
+                if row is None or (row[1] <= now and not stale):
+                    return None
+                conn.execute('UPDATE responses SET accessed = ? WHERE url = ?', (now, key))
+            except sqlite3.Error:
+                return None
+        return CachedResponse(bytes(row[0]), row[1], row[2], row[3])
+
+    def renew(self, url, ttl):
+        now = time.time()
+        with self.__lock:
+            try:
+                self.__connect().execute('UPDATE responses SET expires = ?, accessed = ? WHERE url = ?',
+                                         (now + ttl, now, normalize_url(url)))
+            except sqlite3.Error:
+                pass
+
+    def set(self, url, body, ttl, etag=None, modified=None):
+        if not ttl or body is None:
+            return
+        if not isinstance(body, bytes):
+            body = body.encode('utf-8')
+        if len(body) > self.maxsize:
+            return
+        now = time.time()
+        with self.__lock:
+            try:
+                conn = self.__connect()
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    conn.execute('INSERT OR REPLACE INTO responses '
+                                 '(url, body, size, expires, accessed, etag, modified) '
+                                 'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                                 (normalize_url(url), sqlite3.Binary(body), len(body), now + ttl, now,
+                                  etag, modified))
+                    self.__evict(conn)
+                    conn.execute('COMMIT')
+                except sqlite3.Error:
+                    conn.execute('ROLLBACK')
+                    raise
+            except sqlite3.Error:
+                pass
+
+    def delete(self, url):
+        with self.__lock:
+            try:
+                self.__connect().execute('DELETE FROM responses WHERE url = ?', (normalize_url(url),))
+            except sqlite3.Error:
+                pass
+
+    def __evict(self, conn):
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.maxsize:
+            return
+        freed = 0
+        urls = []
+        for url, size in conn.execute('SELECT url, size FROM responses ORDER BY accessed'):
+            urls.append((url,))
+            freed += size
+            if total - freed <= self.maxsize:
+                break
+        conn.executemany('DELETE FROM responses WHERE url = ?', urls)
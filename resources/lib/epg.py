@@ -0,0 +1,151 @@
+import json
+import sqlite3
+import threading
+import time
+
+
+class EpgStore(object):
+    """Local copy of the tv guide listings.
+
+    Listings are saved in SQLite indexed by channel and time, so the guide
+    of a day and the programs on air can be answered with a range query.
+    Every downloaded guide range is recorded together with the time it was
+    downloaded, so ``covers`` can tell when the local data is enough.
+    Times are timestamps in milliseconds like in the mediaset feeds.
+    """
+
+    SCHEMA_VERSION = 1
+    # listings older than this are removed, the guide shows the last 16 days
+    RETENTION = 17 * 24 * 60 * 60 * 1000
+
+    def __init__(self, path, ttl):
+        self.path = path
+        self.ttl = ttl
+        self.__conn = None
+        self.__lock = threading.RLock()
+
+    def __connect(self):
+        if self.__conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            if conn.execute('PRAGMA user_version').fetchone()[0] != self.SCHEMA_VERSION:
+                conn.execute('DROP TABLE IF EXISTS listings')
+                conn.execute('DROP TABLE IF EXISTS coverage')
+                conn.execute('DROP TABLE IF EXISTS channels')
+                conn.execute('PRAGMA user_version = {}'.format(self.SCHEMA_VERSION))
+            conn.execute('CREATE TABLE IF NOT EXISTS listings ('
+                         'callSign TEXT NOT NULL, startTime INTEGER NOT NULL, '
+                         'endTime INTEGER NOT NULL, data TEXT NOT NULL, '
+                         'PRIMARY KEY (callSign, startTime))')
+            conn.execute('CREATE INDEX IF NOT EXISTS listings_time '
+                         'ON listings (callSign, startTime, endTime)')
+            conn.execute('CREATE TABLE IF NOT EXISTS coverage ('
+                         'callSign TEXT NOT NULL, start INTEGER NOT NULL, '
+                         'finish INTEGER NOT NULL, fetched REAL NOT NULL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS coverage_channel '
+                         'ON coverage (callSign, start, finish)')
+            conn.execute('CREATE TABLE IF NOT EXISTS channels ('
+                         'callSign TEXT PRIMARY KEY, title TEXT NOT NULL, fetched REAL NOT NULL)')
+            self.__conn = conn
+        return self.__conn
+
+    def store(self, callSign, listings, ranges=None):
+        """Save the listings of a channel.
+
+        When a list of ``(start, finish)`` ``ranges`` is given the listings
+        are the whole guide of those ranges: the old listings starting in them
+        are replaced and every range is recorded as covered on its own.
+        """
+        now = time.time()
+        rows = [(callSign, el['startTime'], el['endTime'], json.dumps(el))
+                for el in listings if 'startTime' in el and 'endTime' in el]
+        with self.__lock:
+            try:
+                conn = self.__connect()
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    for start, finish in ranges or []:
+                        conn.execute('DELETE FROM listings WHERE callSign = ? AND '
+                                     'startTime >= ? AND startTime <= ?', (callSign, start, finish))
+                        conn.execute('DELETE FROM coverage WHERE callSign = ? AND '
+                                     'start >= ? AND finish <= ?', (callSign, start, finish))
+                        conn.execute('INSERT INTO coverage (callSign, start, finish, fetched) '
+                                     'VALUES (?, ?, ?, ?)', (callSign, start, finish, now))
+                    conn.executemany('INSERT OR REPLACE INTO listings '
+                                     '(callSign, startTime, endTime, data) VALUES (?, ?, ?, ?)',
+                                     rows)
+                    oldest = now * 1000 - self.RETENTION
+                    conn.execute('DELETE FROM listings WHERE endTime < ?', (oldest,))
+                    conn.execute('DELETE FROM coverage WHERE finish < ?', (oldest,))
+                    conn.execute('COMMIT')
+                except sqlite3.Error:
+                    conn.execute('ROLLBACK')
+                    raise
+            except sqlite3.Error:
+                pass
+
+    def storeChannels(self, channels):
+        now = time.time()
+        with self.__lock:
+            try:
+                conn = self.__connect()
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    conn.execute('DELETE FROM channels')
+                    conn.executemany('INSERT OR REPLACE INTO channels (callSign, title, fetched) '
+                                     'VALUES (?, ?, ?)',
+                                     [(cs, title, now) for cs, title in channels])
+                    conn.execute('COMMIT')
+                except sqlite3.Error:
+                    conn.execute('ROLLBACK')
+                    raise
+            except sqlite3.Error:
+                pass
+
+    def channels(self):
+        with self.__lock:
+            try:
+                rows = self.__connect().execute(
+                    'SELECT callSign, title FROM channels WHERE fetched > ? ORDER BY rowid',
+                    (time.time() - self.ttl,)).fetchall()
+            except sqlite3.Error:
+                return []
+        return rows
+
+    def covers(self, callSign, start, finish):
+        # ranges already in the past when downloaded don't change anymore
+        now = time.time()
+        with self.__lock:
+            try:
+                row = self.__connect().execute(
+                    'SELECT 1 FROM coverage WHERE callSign = ? AND start <= ? AND finish >= ? '
+                    'AND (fetched > ? OR finish < fetched * 1000) LIMIT 1',
+                    (callSign, start, finish, now - self.ttl)).fetchone()
+            except sqlite3.Error:
+                return False
+        return row is not None
+
+    def listings(self, callSign, start, finish):
+        with self.__lock:
+            try:
+                rows = self.__connect().execute(
+                    'SELECT data FROM listings WHERE callSign = ? AND startTime <= ? AND '
+                    'endTime >= ? ORDER BY startTime', (callSign, finish, start)).fetchall()
+            except sqlite3.Error:
+                return []
+        return [json.loads(r[0]) for r in rows]
+
+    def nowNext(self, callSign, now):
+        """Return the listing on air at ``now`` and the following one."""
+        with self.__lock:
+            try:
+                rows = self.__connect().execute(
+                    'SELECT data FROM listings WHERE callSign = ? AND endTime > ? '
+                    'ORDER BY startTime LIMIT 2', (callSign, now)).fetchall()
+            except sqlite3.Error:
+                return None, None
+        els = [json.loads(r[0]) for r in rows]
+        current = els.pop(0) if els and els[0]['startTime'] <= now else None
+        return current, els[0] if els else None
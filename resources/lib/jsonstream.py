@@ -0,0 +1,115 @@
+import json
+import re
+
+_DECODER = json.JSONDecoder()
+_WS = re.compile(r'[ \t\n\r]*')
+_ERROR = re.compile(r'"isException"\s*:\s*true|"isOk"\s*:\s*false')
+
+
+def is_error(text):
+    """Tell if a json document is an error answer of the mediaset apis.
+
+    The error documents are small and the flags are among their first keys,
+    so only the beginning of the text is searched.
+    """
+    return _ERROR.search(text, 0, 1024) is not None
+
+
+class JsonStream(object):
+    """Incremental reader for json documents holding one big array.
+
+    ``items`` parses the elements of the array found following ``path`` one
+    at a time, so the full document is never turned into python objects.
+    The scalar values met in the objects along the path, before or after the
+    array, are saved in ``meta`` by key; the ones after the array are only
+    available once all the elements have been consumed.
+    """
+
+    def __init__(self, text):
+        self.text = text
+        self.meta = {}
+        self.found = False
+
+    def __ws(self, pos):
+        return _WS.match(self.text, pos).end()
+
+    def __decode(self, pos):
+        return _DECODER.raw_decode(self.text, pos)
+
+    def __members(self, pos):
+        # yields (key, position of the value) of the object starting at pos, the
+        # caller sends back the position where the value ends
+        if self.text[pos] != '{':
+            raise ValueError('Expecting object at {}'.format(pos))
+        pos = self.__ws(pos + 1)
+        if self.text[pos] == '}':
+            return pos + 1
+        while True:
+            key, pos = self.__decode(pos)
+            pos = self.__ws(pos)
+            if self.text[pos] != ':':
+                raise ValueError('Expecting : at {}'.format(pos))
+            pos = yield key, self.__ws(pos + 1)
+            pos = self.__ws(pos)
+            if self.text[pos] == '}':
+                return pos + 1
+            if self.text[pos] != ',':
+                raise ValueError('Expecting , at {}'.format(pos))
+            pos = self.__ws(pos + 1)
+
+    def __walk(self, pos, path):
+        members = self.__members(pos)
+        try:
+            key, pos = next(members)
+            while True:
+                if path and key == path[0]:
+                    if len(path) == 1:
+                        if self.text[pos] == '[':
+                            self.found = True
+                            pos = yield from self.__elements(pos)
+                        else:
+                            _, pos = self.__decode(pos)
+                    elif self.text[pos] == '{':
+                        pos = yield from self.__walk(pos, path[1:])
+                    else:
+                        _, pos = self.__decode(pos)
+                    path = None
+                else:
+                    value, pos = self.__decode(pos)
+                    if not isinstance(value, (dict, list)):
+                        self.meta[key] = value
+                key, pos = members.send(pos)
+        except StopIteration as e:
+            return e.value
+
+    def __elements(self, pos):
+        pos = self.__ws(pos + 1)
+        if self.text[pos] == ']':
+            return pos + 1
+        while True:
+            item, pos = self.__decode(pos)
+            yield item
+            pos = self.__ws(pos)
+            if self.text[pos] == ']':
+                return pos + 1
+            if self.text[pos] != ',':
+                raise ValueError('Expecting , at {}'.format(pos))
+            pos = self.__ws(pos + 1)
+
+    def items(self, *path):
+        for item in self.__walk(self.__ws(0), path):
+            yield item
+
+
+class LazyFlag(object):
+    """Truth value of a ``JsonStream.meta`` key, read when it's tested."""
+
+    def __init__(self, meta, key, default=False):
+        self.meta = meta
+        self.key = key
+        self.default = default
+
+    def __bool__(self):
+        return bool(self.meta.get(self.key, self.default))
+
+    __nonzero__ = __bool__
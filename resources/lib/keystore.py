@@ -0,0 +1,58 @@
+import json
+import os
+import threading
+import time
+
+
+class KeyStore(object):
+    """Small JSON backed store for values that must survive plugin invocations.
+
+    Every value is saved with an absolute expiry timestamp, expired values are
+    treated as missing. Writes go through a temporary file so that concurrent
+    plugin processes never read a truncated file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def __load(self):
+        if not self.path or not os.path.isfile(self.path):
+            return {}
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except (IOError, OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
+    def __save(self, data):
+        if not self.path:
+            return
+        tmp = '{}.{}.{}.tmp'.format(self.path, os.getpid(), threading.current_thread().ident)
+        try:
+            fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+        except (IOError, OSError):
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    def get(self, name):
+        entry = self.__load().get(name)
+        if not entry or entry.get('expires', 0) <= time.time():
+            return None
+        return entry.get('value')
+
+    def set(self, name, value, ttl):
+        data = self.__load()
+        now = time.time()
+        data = {k: v for k, v in data.items() if v.get('expires', 0) > now}
+        data[name] = {'value': value, 'expires': now + ttl}
+        self.__save(data)
+
+    def delete(self, name):
+        data = self.__load()
+        if name in data:
+            del data[name]
+            self.__save(data)
@@ -1,139 +1,259 @@
 import json
-import xml.etree.ElementTree as ET
+import os
+import re
+import threading
+import time
+from datetime import timedelta
+from types import MappingProxyType
+from itertools import chain
 from phate89lib import rutils, staticutils  # pylint: disable=import-error
+from resources.lib.jsonstream import JsonStream, LazyFlag, is_error
+from resources.lib.keystore import KeyStore
+from resources.lib.parallel import map_parallel
+from resources.lib.reco import RecoV2
+from resources.lib.tracing import RequestTrace
+from resources.mediaset_datahelper import FEED_FIELDS
 try:
-    from urllib.parse import urlencode, quote
+    from urllib.parse import urlencode, quote, unquote, urlsplit
 except ImportError:
-    from urllib import urlencode, quote
+    from urllib import urlencode, quote, unquote
+    from urlparse import urlsplit
+
+
+# uxReference of the catalogue listings by section id
+UX_REFERENCE_MAPPING = MappingProxyType({
+    'CWDOCUBIOSTORIE': 'documentariBioStoria',
+    'CWDOCUINCHIESTE': 'documentariInchiesta',
+    'CWDOCUMOSTRECENT': 'mostRecentDocumentariFep',
+    'CWDOCUNATURANIMALI': 'documentariNatura',
+    'CWDOCUSCIENZATECH': 'documentariScienza',
+    'CWDOCUSPAZIO': 'documentariSpazio',
+    'CWDOCUTOPVIEWED': 'stagioniDocumentari',
+    'CWENABLERKIDS': 'stagioniKids',
+    'CWFICTIONADVENTURE': 'stagioniFictionAvventura',
+    'CWFICTIONBIOGRAPHICAL': 'stagioniFictionBiografico',
+    'CWFICTIONCOMEDY': 'stagioniFictionCommedia',
+    'CWFICTIONDRAMATIC': 'stagioniFictionDrammatico',
+    'CWFICTIONPOLICE': 'stagioniFictionPoliziesco',
+    'CWFICTIONSENTIMENTAL': 'stagioniFictionSentimentale',
+    'CWFICTIONSITCOM': 'stagioniFictionSitCom',
+    'CWFICTIONSOAP': 'mostRecentSoapOpera',
+    'CWFILMACTION': 'filmAzioneThrillerAvventura',
+    'CWFILMCLASSIC': 'filmClassici',
+    'CWFILMCOMEDY': 'filmCommedia',
+    'CWFILMDOCU': 'filmDocumentario',
+    'CWFILMDRAMATIC': 'filmDrammatico',
+    'CWFILMSENTIMENTAL': 'filmSentimentale',
+    'CWFILMTOPVIEWED': 'filmPiuVisti24H',
+    'CWHOMEBRANDS': 'personToContentHomepage',
+    'CWHOMEFICTIONNOWELITE': 'stagioniFictionSerieTvSezione',
+    'CWHOMEFICTIONNOWPOP': 'stagioniFictionSerieTvHomepage',
+    'CWHOMEPROGTVNOW': 'stagioniProgrammiTv',
+    'CWKIDSBOINGFORYOU': 'kidsBoing',
+    'CWKIDSCARTOONITO': 'kidsCartoonito',
+    'CWKIDSMEDIASETBRAND': 'kidsMediaset',
+    'CWPROGTVDAY': 'stagioniDaytime',
+    'CWPROGTVMAGAZINE': 'stagioniCucinaLifestyle',
+    'CWPROGTVPRIME': 'stagioniPrimaSerata',
+    'CWPROGTVSPORT': 'mostRecentSport',
+    'CWPROGTVTALENT': 'stagioniReality',
+    'CWPROGTVTALK': 'stagioniTalk',
+    'CWPROGTVTG': 'mostRecentTg',
+    'CWPROGTVTOPVIEWED': 'programmiTvClip24H',
+    'CWPROGTVVARIETY': 'stagioniVarieta',
+    'CWSEARCHBRAND': 'searchStagioni',
+    'CWSEARCHCLIP': 'searchClip',
+    'CWSEARCHEPISODE': 'searchEpisodi',
+    'CWSEARCHMOVIE': 'searchMovie',
+    'CWSIMILARDOCUMENTARI': 'similarDocumentari',
+    'CWSIMILARFICTION': 'similarSerieTvFiction',
+    'CWSIMILARFILM': 'similarCinema',
+    'CWSIMILARINFORMAZIONE': 'similarInformazione',
+    'CWSIMILARINTRATTENIMENTO': 'similarIntrattenimento',
+    'CWSIMILARKIDS': 'similarCartoni',
+    'CWSIMILARSERIETV': 'similarSerieTvFiction',
+    'CWSIMILARSPORT': 'similarSport',
+    'CWSIMILARTG': 'similarTg',
+    'CWTOPSEARCHBRAND': 'defaultSearchStagioni',
+    'CWTOPSEARCHCLIP': 'defaultSearchVideo',
+    'CWTOPVIEWEDDAY': 'piuVisti24H',
+    'documentariBioStoria': 'documentariBioStoria',
+    'documentariInchiesta': 'documentariInchiesta',
+    'documentariNatura': 'documentariNatura',
+    'documentariScienza': 'documentariScienza',
+    'documentariSpazio': 'documentariSpazio',
+    'filmAzioneThrillerAvventura': 'filmAzioneThrillerAvventura',
+    'filmClassici': 'filmClassici',
+    'filmCommedia': 'filmCommedia',
+    'filmDocumentario': 'filmDocumentario',
+    'filmDrammatico': 'filmDrammatico',
+    'filmPiuVisti24H': 'filmPiuVisti24H',
+    'filmSentimentale': 'filmSentimentale',
+    'kidsBoing': 'kidsBoing',
+    'kidsCartoonito': 'kidsCartoonito',
+    'kidsMediaset': 'kidsMediaset',
+    'mostRecentDocumentariFep': 'mostRecentDocumentariFep',
+    'mostRecentSoapOpera': 'mostRecentSoapOpera',
+    'mostRecentSport': 'mostRecentSport',
+    'mostRecentTg': 'mostRecentTg',
+    'personToContentFilm': 'personToContentFilm',
+    'personToContentHomepage': 'personToContentHomepage',
+    'piuVisti24H': 'piuVisti24H',
+    'programmiTvClip24H': 'programmiTvClip24H',
+    'similarCartoni': 'similarCartoni',
+    'similarCinema': 'similarCinema',
+    'similarDocumentari': 'similarDocumentari',
+    'similarInformazione': 'similarInformazione',
+    'similarIntrattenimento': 'similarIntrattenimento',
+    'similarSerieTvFiction': 'similarSerieTvFiction',
+    'similarSport': 'similarSport',
+    'similarTg': 'similarTg',
+    'stagioniCucinaLifestyle': 'stagioniCucinaLifestyle',
+    'stagioniDaytime': 'stagioniDaytime',
+    'stagioniDocumentari': 'stagioniDocumentari',
+    'stagioniFictionAvventura': 'stagioniFictionAvventura',
+    'stagioniFictionBiografico': 'stagioniFictionBiografico',
+    'stagioniFictionCommedia': 'stagioniFictionCommedia',
+    'stagioniFictionDrammatico': 'stagioniFictionDrammatico',
+    'stagioniFictionPoliziesco': 'stagioniFictionPoliziesco',
+    'stagioniFictionSentimentale': 'stagioniFictionSentimentale',
+    'stagioniFictionSerieTvHomepage': 'stagioniFictionSerieTvHomepage',
+    'stagioniFictionSerieTvSezione': 'stagioniFictionSerieTvSezione',
+    'stagioniFictionSitCom': 'stagioniFictionSitCom',
+    'stagioniKids': 'stagioniKids',
+    'stagioniPrimaSerata': 'stagioniPrimaSerata',
+    'stagioniProgrammiTv': 'stagioniProgrammiTv',
+    'stagioniReality': 'stagioniReality',
+    'stagioniTalk': 'stagioniTalk',
+    'stagioniVarieta': 'stagioniVarieta'
+})
 
 
 class Mediaset(rutils.RUtils):
 
     USERAGENT = "VideoMediaset Kodi Addon"
-
-    def __init__(self):
+    ANONYMOUS_KEYS_TTL = 6 * 60 * 60
+    ACCOUNT_KEYS_TTL = 6 * 60 * 60
+    ACCOUNT_SIGNATURE_TTL = 24 * 60 * 60
+    ACCEDO_SESSION_TTL = 30 * 60
+    PREFLIGHT_TTL = 60 * 60
+    EPG_TTL = 6 * 60 * 60
+    ACCEDO_SECTIONS_TTL = 6 * 60 * 60
+    # resolved streams are kept until the expiry found in their url, minus a margin,
+    # or for the default time when the url has none
+    VIDEO_DATA_TTL = 30 * 60
+    VIDEO_DATA_MAX_TTL = 6 * 60 * 60
+    VIDEO_DATA_MARGIN = 60
+    VIDEO_EXPIRY = re.compile(r'\b(?:exp|expires|expiry|e)=(\d{10})\b')
+    uxReferenceMapping = UX_REFERENCE_MAPPING
+    # accedo entries holding the sections of the root menus, loaded all together
+    ACCEDO_ENTRIES = ('5acfc8011de1c4000b6ec953', '5acfcb3c23eec6000d64a6a4',
+                      '60939f971de1c400174817cb', '5acfcb8323eec6000d64a6b3',
+                      '5bfd17c423eec6001aec49f9')
+    # seconds each endpoint family is kept in the response cache, first match wins
+    CACHE_TTLS = (
+        ('/nownext/', 30),
+        ('/mediaset-prod-all-listings', 30),
+        ('/mediaset-prod-all-stations', 6 * 60 * 60),
+        ('/azlisting/', 10 * 60),
+        ('/cataloguelisting/', 10 * 60),
+        ('/reco/', 10 * 60),
+        ('/search/', 5 * 60),
+        ('feed.entertainment.tv.theplatform.eu/', 15 * 60),
+    )
+
+    def __init__(self, datapath=None, cachesize=0):
         self.__UID = ''
         self.__UIDSignature = ''
         self.__signatureTimestamp = ''
+        self.__account = ''
         self.apigw = ''
         self.cts = ''
         self.__tracecid = ''
         self.__cwid = ''
-        self.anonymousLogin()
-        self.uxReferenceMapping = {
-            'CWDOCUBIOSTORIE': 'documentariBioStoria',
-            'CWDOCUINCHIESTE': 'documentariInchiesta',
-            'CWDOCUMOSTRECENT': 'mostRecentDocumentariFep',
-            'CWDOCUNATURANIMALI': 'documentariNatura',
-            'CWDOCUSCIENZATECH': 'documentariScienza',
-            'CWDOCUSPAZIO': 'documentariSpazio',
-            'CWDOCUTOPVIEWED': 'stagioniDocumentari',
-            'CWENABLERKIDS': 'stagioniKids',
-            'CWFICTIONADVENTURE': 'stagioniFictionAvventura',
-            'CWFICTIONBIOGRAPHICAL': 'stagioniFictionBiografico',
-            'CWFICTIONCOMEDY': 'stagioniFictionCommedia',
-            'CWFICTIONDRAMATIC': 'stagioniFictionDrammatico',
-            'CWFICTIONPOLICE': 'stagioniFictionPoliziesco',
-            'CWFICTIONSENTIMENTAL': 'stagioniFictionSentimentale',
-            'CWFICTIONSITCOM': 'stagioniFictionSitCom',
-            'CWFICTIONSOAP': 'mostRecentSoapOpera',
-            'CWFILMACTION': 'filmAzioneThrillerAvventura',
-            'CWFILMCLASSIC': 'filmClassici',
-            'CWFILMCOMEDY': 'filmCommedia',
-            'CWFILMDOCU': 'filmDocumentario',
-            'CWFILMDRAMATIC': 'filmDrammatico',
-            'CWFILMSENTIMENTAL': 'filmSentimentale',
-            'CWFILMTOPVIEWED': 'filmPiuVisti24H',
-            'CWHOMEBRANDS': 'personToContentHomepage',
-            'CWHOMEFICTIONNOWELITE': 'stagioniFictionSerieTvSezione',
-            'CWHOMEFICTIONNOWPOP': 'stagioniFictionSerieTvHomepage',
-            'CWHOMEPROGTVNOW': 'stagioniProgrammiTv',
-            'CWKIDSBOINGFORYOU': 'kidsBoing',
-            'CWKIDSCARTOONITO': 'kidsCartoonito',
-            'CWKIDSMEDIASETBRAND': 'kidsMediaset',
-            'CWPROGTVDAY': 'stagioniDaytime',
-            'CWPROGTVMAGAZINE': 'stagioniCucinaLifestyle',
-            'CWPROGTVPRIME': 'stagioniPrimaSerata',
-            'CWPROGTVSPORT': 'mostRecentSport',
-            'CWPROGTVTALENT': 'stagioniReality',
-            'CWPROGTVTALK': 'stagioniTalk',
-            'CWPROGTVTG': 'mostRecentTg',
-            'CWPROGTVTOPVIEWED': 'programmiTvClip24H',
-            'CWPROGTVVARIETY': 'stagioniVarieta',
-            'CWSEARCHBRAND': 'searchStagioni',
-            'CWSEARCHCLIP': 'searchClip',
-            'CWSEARCHEPISODE': 'searchEpisodi',
-            'CWSEARCHMOVIE': 'searchMovie',
-            'CWSIMILARDOCUMENTARI': 'similarDocumentari',
-            'CWSIMILARFICTION': 'similarSerieTvFiction',
-            'CWSIMILARFILM': 'similarCinema',
-            'CWSIMILARINFORMAZIONE': 'similarInformazione',
-            'CWSIMILARINTRATTENIMENTO': 'similarIntrattenimento',
-            'CWSIMILARKIDS': 'similarCartoni',
-            'CWSIMILARSERIETV': 'similarSerieTvFiction',
-            'CWSIMILARSPORT': 'similarSport',
-            'CWSIMILARTG': 'similarTg',
-            'CWTOPSEARCHBRAND': 'defaultSearchStagioni',
-            'CWTOPSEARCHCLIP': 'defaultSearchVideo',
-            'CWTOPVIEWEDDAY': 'piuVisti24H',
-            'documentariBioStoria': 'documentariBioStoria',
-            'documentariInchiesta': 'documentariInchiesta',
-            'documentariNatura': 'documentariNatura',
-            'documentariScienza': 'documentariScienza',
-            'documentariSpazio': 'documentariSpazio',
-            'filmAzioneThrillerAvventura': 'filmAzioneThrillerAvventura',
-            'filmClassici': 'filmClassici',
-            'filmCommedia': 'filmCommedia',
-            'filmDocumentario': 'filmDocumentario',
-            'filmDrammatico': 'filmDrammatico',
-            'filmPiuVisti24H': 'filmPiuVisti24H',
-            'filmSentimentale': 'filmSentimentale',
-            'kidsBoing': 'kidsBoing',
-            'kidsCartoonito': 'kidsCartoonito',
-            'kidsMediaset': 'kidsMediaset',
-            'mostRecentDocumentariFep': 'mostRecentDocumentariFep',
-            'mostRecentSoapOpera': 'mostRecentSoapOpera',
-            'mostRecentSport': 'mostRecentSport',
-            'mostRecentTg': 'mostRecentTg',
-            'personToContentFilm': 'personToContentFilm',
-            'personToContentHomepage': 'personToContentHomepage',
-            'piuVisti24H': 'piuVisti24H',
-            'programmiTvClip24H': 'programmiTvClip24H',
-            'similarCartoni': 'similarCartoni',
-            'similarCinema': 'similarCinema',
-            'similarDocumentari': 'similarDocumentari',
-            'similarInformazione': 'similarInformazione',
-            'similarIntrattenimento': 'similarIntrattenimento',
-            'similarSerieTvFiction': 'similarSerieTvFiction',
-            'similarSport': 'similarSport',
-            'similarTg': 'similarTg',
-            'stagioniCucinaLifestyle': 'stagioniCucinaLifestyle',
-            'stagioniDaytime': 'stagioniDaytime',
-            'stagioniDocumentari': 'stagioniDocumentari',
-            'stagioniFictionAvventura': 'stagioniFictionAvventura',
-            'stagioniFictionBiografico': 'stagioniFictionBiografico',
-            'stagioniFictionCommedia': 'stagioniFictionCommedia',
-            'stagioniFictionDrammatico': 'stagioniFictionDrammatico',
-            'stagioniFictionPoliziesco': 'stagioniFictionPoliziesco',
-            'stagioniFictionSentimentale': 'stagioniFictionSentimentale',
-            'stagioniFictionSerieTvHomepage': 'stagioniFictionSerieTvHomepage',
-            'stagioniFictionSerieTvSezione': 'stagioniFictionSerieTvSezione',
-            'stagioniFictionSitCom': 'stagioniFictionSitCom',
-            'stagioniKids': 'stagioniKids',
-            'stagioniPrimaSerata': 'stagioniPrimaSerata',
-            'stagioniProgrammiTv': 'stagioniProgrammiTv',
-            'stagioniReality': 'stagioniReality',
-            'stagioniTalk': 'stagioniTalk',
-            'stagioniVarieta': 'stagioniVarieta'
-        }
+        self.__keystore = KeyStore(os.path.join(datapath, 'keys.json') if datapath else None)
+        self.__videostore = KeyStore(os.path.join(datapath, 'videos.json') if datapath else None)
+        self.__datapath = datapath
+        self.__cachesize = cachesize
+        self.__cacheStore = None
+        self.__epgStore = None
+        self.serveStale = False
+        # tallest video stream chosen when there are others, 0 for no limit
+        self.videoMaxHeight = 0
+        self.__sections = None
+        self.__keysLock = threading.Lock()
+        self.__reco = RecoV2(lambda url: self.__getJson(url, auth=True, sign=False,
+                                                        preflight=True))
+        self.__staleRequests = []
         rutils.RUtils.__init__(self)
-
-    def __getAPISession(self):
-        res = self.createRequest(
-            "https://api.one.accedo.tv/session?appKey=59ad346f1de1c4000dfd09c5&uuid=sdd")
-        self.setHeader('x-session', res.json()['sessionKey'])
+        self.trace = RequestTrace()
+        # the session can be shared by every client, close removes the hook again
+        self.SESSION.hooks['response'].append(self.trace.hook)
+
+    @property
+    def __cache(self):
+        # the stores are opened when first used, only then sqlite is loaded
+        if self.__cacheStore is None and self.__datapath and self.__cachesize > 0:
+            from resources.lib.cache import ResponseCache
+            self.__cacheStore = ResponseCache(os.path.join(self.__datapath, 'cache.db'),
+                                              self.__cachesize)
+        return self.__cacheStore
+
+    @property
+    def __epg(self):
+        if self.__epgStore is None and self.__datapath:
+            from resources.lib.epg import EpgStore
+            self.__epgStore = EpgStore(os.path.join(self.__datapath, 'epg.db'), self.EPG_TTL)
+        return self.__epgStore
+
+    def close(self):
+        hooks = self.SESSION.hooks['response']
+        if self.trace.hook in hooks:
+            hooks.remove(self.trace.hook)
+
+    def __getAPISession(self, force=False):
+        session = None if force else self.__keystore.get('accedo')
+        if not session:
+            res = self.createRequest(
+                "https://api.one.accedo.tv/session?appKey=59ad346f1de1c4000dfd09c5&uuid=sdd")
+            session = res.json()['sessionKey']
+            self.__keystore.set('accedo', session, self.ACCEDO_SESSION_TTL)
+        self.setHeader('x-session', session)
+
+    def __getAccedoEntries(self, ids):
+        # the entries api returns at most 50 elements for each call
+        entries = []
+        for i in range(0, len(ids), 50):
+            url = "https://api.one.accedo.tv/content/entries?id={eid}&size=50&locale=it".format(
+                eid=quote(",".join(ids[i:i + 50])))
+            res = self.createRequest(url)
+            if res.status_code == 401:
+                self.__getAPISession(True)
+                res = self.createRequest(url)
+            jsn = self.__parseJson(res)
+            if not jsn or 'entries' not in jsn:
+                return None
+            entries.extend(jsn['entries'])
+        return entries
 
     def login(self, user, password):
+        import hashlib
+        self.__account = hashlib.sha256(
+            '{}\n{}'.format(user, password).encode('utf-8')).hexdigest()
+        keys = self.__keystore.get('account')
+        if keys and keys.get('account') == self.__account:
+            self.__setAPIKeys(keys)
+            self.log('Reusing stored login keys', 4)
+            return True
+        signature = self.__keystore.get('signature')
+        if signature and signature.get('account') == self.__account:
+            self.__UID = signature['UID']
+            self.__UIDSignature = signature['UIDSignature']
+            self.__signatureTimestamp = signature['signatureTimestamp']
+            self.log('Trying to login with stored signature', 4)
+            if self.__getAPIKeys(True):
+                return True
+            self.__keystore.delete('signature')
         self.log('Trying to login with user data', 4)
         data = {
             "loginID": user,
@@ -155,18 +275,19 @@ class Mediaset(rutils.RUtils):
         res = self.createRequest(
             "https://login.mediaset.it/accounts.login", post=data)
         if "captcha" in res.text:
-        self.log('CAPTCHA required. Please complete it in your browser.', 4)
-        
-        # Mostra un messaggio all'utente
-        xbmcgui.Dialog().ok("CAPTCHA Required", 
-                             "A CAPTCHA is required to continue. Please complete it in your browser.\n"
-                             "After completing the CAPTCHA, return to the addon and try again.")
-        
-        # Puoi anche fornire un link al sito
-        xbmcgui.Dialog().ok("Link to Site", 
-                             "Visit: https://mediasetinfinity.mediaset.it/ to complete the CAPTCHA.")
-        
-        return False
+            self.log('CAPTCHA required. Please complete it in your browser.', 4)
+            import xbmcgui  # pylint: disable=import-error
+
+            # Mostra un messaggio all'utente
+            xbmcgui.Dialog().ok("CAPTCHA Required",
+                                "A CAPTCHA is required to continue. Please complete it in your browser.\n"
+                                "After completing the CAPTCHA, return to the addon and try again.")
+
+            # Puoi anche fornire un link al sito
+            xbmcgui.Dialog().ok("Link to Site",
+                                "Visit: https://mediasetinfinity.mediaset.it/ to complete the CAPTCHA.")
+
+            return False
         s = res.text.strip().replace('gigya.callback(', '', 1)
         if s[-1:] == ';':
             s = s[:-1]
@@ -179,12 +300,42 @@ class Mediaset(rutils.RUtils):
         self.__UID = jsn['UID']
         self.__UIDSignature = jsn['UIDSignature']
         self.__signatureTimestamp = jsn['signatureTimestamp']
+        self.__keystore.set('signature', {'account': self.__account,
+                                          'UID': self.__UID,
+                                          'UIDSignature': self.__UIDSignature,
+                                          'signatureTimestamp': self.__signatureTimestamp},
+                            self.ACCOUNT_SIGNATURE_TTL)
         self.log('Logged with user {} successfully', 4)
         return self.__getAPIKeys(True)
 
-    def anonymousLogin(self):
+    def logout(self):
+        self.__keystore.delete('account')
+        self.__keystore.delete('signature')
+
+    def anonymousLogin(self, force=False):
+        if not force:
+            keys = self.__keystore.get('anonymous')
+            if keys:
+                self.__setAPIKeys(keys)
+                self.log('Reusing stored keys', 4)
+                return True
         return self.__getAPIKeys()
 
+    def __ensureAPIKeys(self):
+        # keys are only needed by the api-ott gateway, get them the first time one is called
+        if not self.__tracecid:
+            with self.__keysLock:
+                if not self.__tracecid:
+                    self.anonymousLogin()
+
+    def __setAPIKeys(self, keys):
+        self.apigw = keys['apigw']
+        self.cts = keys['cts']
+        self.setHeader('t-apigw', self.apigw)
+        self.setHeader('t-cts', self.cts)
+        self.__tracecid = keys['traceCid']
+        self.__cwid = keys['cwId']
+
     def __getAPIKeys(self, login=False):
         if login:
             data = {"platform": "pc",
@@ -203,25 +354,169 @@ class Mediaset(rutils.RUtils):
         if not jsn['isOk']:
             return False
 
-        self.apigw = res.headers['t-apigw']
-        self.cts = res.headers['t-cts']
-        self.setHeader('t-apigw', self.apigw)
-        self.setHeader('t-cts', self.cts)
-        self.__tracecid = jsn['response']['traceCid']
-        self.__cwid = jsn['response']['cwId']
+        keys = {'apigw': res.headers['t-apigw'],
+                'cts': res.headers['t-cts'],
+                'traceCid': jsn['response']['traceCid'],
+                'cwId': jsn['response']['cwId']}
+        self.__setAPIKeys(keys)
+        if login:
+            keys['account'] = self.__account
+            self.__keystore.set('account', keys, self.ACCOUNT_KEYS_TTL)
+        else:
+            self.__keystore.set('anonymous', keys, self.ANONYMOUS_KEYS_TTL)
         self.log('Retrieved keys successfully', 4)
         return True
 
-    def __getEntriesFromUrl(self, url, args=None):
-        data = self.getJson(self.__create_url(url, args))
+    def __signUrl(self, url):
+        args = {}
+        if self.__tracecid:
+            args['traceCid'] = self.__tracecid
+        if self.__cwid:
+            args['cwId'] = self.__cwid
+        if not args:
+            return url
+        if url.endswith('?') or url.endswith('&'):
+            return url + urlencode(args)
+        return url + ('&' if '?' in url else '?') + urlencode(args)
+
+    def __cacheTtl(self, url):
+        if self.__cache is None:
+            return 0
+        for pattern, ttl in self.CACHE_TTLS:
+            if pattern in url:
+                return ttl
+        return 0
+
+    def __getJson(self, url, auth=False, sign=True, preflight=False):
+        return self.__loadJson(self.__getText(url, auth, sign, preflight))
+
+    def __getText(self, url, auth=False, sign=True, preflight=False):
+        ttl = self.__cacheTtl(url)
+        cached = self.__cache.get(url, stale=True) if ttl else None
+        if cached is not None:
+            if cached.expires > time.time():
+                self.trace.hit(url, len(cached.body))
+                return self.__decode(cached.body)
+            if self.serveStale:
+                # use the expired copy now, refreshStale will download it later
+                self.__staleRequests.append((url, auth, sign, preflight))
+                self.trace.hit(url, len(cached.body))
+                return self.__decode(cached.body)
+        return self.__downloadText(url, ttl, cached, auth, sign, preflight)
+
+    def refreshStale(self):
+        changed = False
+        requests, self.__staleRequests = self.__staleRequests, []
+        for url, auth, sign, preflight in requests:
+            ttl = self.__cacheTtl(url)
+            cached = self.__cache.get(url, stale=True)
+            self.__downloadText(url, ttl, cached, auth, sign, preflight)
+            fresh = self.__cache.get(url)
+            if fresh is not None and (cached is None or fresh.body != cached.body):
+                changed = True
+        return changed
+
+    def __preflight(self, url):
+        # the answer only depends on the endpoint, not on the parameters
+        parts = urlsplit(url)
+        endpoint = parts.netloc + parts.path
+        done = self.__keystore.get('preflight') or []
+        if endpoint in done:
+            return True
+        if not self.SESSION.options(url).ok:
+            return False
+        self.__keystore.set('preflight', done + [endpoint], self.PREFLIGHT_TTL)
+        return True
+
+    def __downloadText(self, url, ttl, cached, auth, sign, preflight):
+        if auth:
+            self.__ensureAPIKeys()
+        if preflight and not self.__preflight(url):
+            return None
+        reqUrl = self.__signUrl(url) if auth and sign else url
+        if cached is not None and (cached.etag or cached.modified):
+            # revalidate the expired copy, a 304 answer means it can be used as it is
+            headers = {}
+            if cached.etag:
+                headers['If-None-Match'] = cached.etag
+            if cached.modified:
+                headers['If-Modified-Since'] = cached.modified
+            res = self.SESSION.get(reqUrl, headers=headers)
+            if res.status_code == 304:
+                self.__cache.renew(url, ttl)
+                return self.__decode(cached.body)
+        else:
+            res = self.createRequest(reqUrl)
+        text = self.__decode(res.content)
+        if auth and (res.status_code in (401, 403) or not text or is_error(text)):
+            self.log('Keys rejected, trying to get new ones', 4)
+            self.__keystore.delete('anonymous')
+            if not self.anonymousLogin(force=True):
+                return text
+            res = self.createRequest(self.__signUrl(url) if sign else url)
+            text = self.__decode(res.content)
+        if ttl and res.status_code == 200 and text and not is_error(text):
+            self.__cache.set(url, res.content, ttl,
+                             res.headers.get('ETag'), res.headers.get('Last-Modified'))
+        return text
+
+    @staticmethod
+    def __parseJson(res):
+        try:
+            return res.json()
+        except ValueError:
+            return None
+
+    @staticmethod
+    def __decode(body):
+        # skip the charset detection of requests, the apis always answer in utf-8
+        try:
+            return body.decode('utf-8')
+        except (AttributeError, UnicodeDecodeError):
+            return None
+
+    @staticmethod
+    def __loadJson(text):
+        if not text:
+            return None
+        try:
+            return json.loads(text)
+        except ValueError:
+            return None
+
+    @staticmethod
+    def __streamEntries(text, *path):
+        # parse the entries one by one while they are used, None if they are not found
+        reader = JsonStream(text)
+        items = reader.items(*path)
+        try:
+            first = next(items, None)
+        except ValueError:
+            return None, None
+        if not reader.found:
+            return None, None
+        return chain([first] if first is not None else [], items), reader.meta
+
+    def __getEntriesFromUrl(self, url, args=None, auth=False, stream=False):
+        text = self.__getText(self.__create_url(url, args), auth)
+        if stream and text:
+            entries, _ = self.__streamEntries(text, 'entries')
+            if entries is not None:
+                return entries
+        data = self.__loadJson(text)
         if data and 'entries' in data:
             return data['entries']
         return data
 
-    def __getElsFromUrl(self, url):
+    def __getElsFromUrl(self, url, auth=False, stream=False):
         res = None
         hasMore = False
-        data = self.getJson(url)
+        text = self.__getText(url, auth)
+        if stream and text:
+            entries, meta = self.__streamEntries(text, 'response', 'entries')
+            if entries is not None and meta.get('isOk'):
+                return entries, LazyFlag(meta, 'hasMore')
+        data = self.__loadJson(text)
         if data and 'isOk' in data and data['isOk']:
             if 'response' in data:
                 if 'hasMore' in data['response']:
@@ -234,62 +529,43 @@ class Mediaset(rutils.RUtils):
                 res = data['entries']
         return res, hasMore
 
-    def __getElsFromUrlV2(self, url):
-        res = None
-        hasMore = False
-        r = self.SESSION.options(url)
-        if not r.ok:
-            return res, hasMore
-        data = self.getJson(url)
-        if data and 'isOk' in data and data['isOk']:
-            if 'response' in data and 'pagination' in data['response']:
-                if 'hasNextPage' in data['response']['pagination']:
-                    hasMore = data['response']['pagination']['hasNextPage']
-                if 'blocks' in data['response']:
-                    res = []
-                    for b in data['response']['blocks']:
-                        if 'items' in b:
-                            res.extend(b['items'])
-                else:
-                    res = None
-        return res, hasMore
-
-    def __getCatsFromUrlV2(self, url, tmpid):
-        res = None
-        hasMore = False
-        r = self.SESSION.options(url)
-        if not r.ok:
-            return res, hasMore
-        data = self.getJson(url)
-        if data and 'isOk' in data and data['isOk']:
-            if 'response' in data and 'pagination' in data['response']:
-                if 'hasNextPage' in data['response']['pagination']:
-                    hasMore = data['response']['pagination']['hasNextPage']
-                if 'blocks' in data['response']:
-                    res = []
-                    for b in data['response']['blocks']:
-                        if 'title' in b:
-                            if '_viewAll' in b:
-                                res.append({'id': b['_viewAll'], 'title': b['title']})
-                            else:
-                                res.append({'code': tmpid, 'title': b['title']})
-                else:
-                    res = None
-        return res, hasMore
-
     def __getsectionsFromEntryID(self, eid):
+        if self.__sections is None:
+            self.__sections = self.__getSectionsTree()
+        return self.__sections.get(eid, False)
+
+    def __getSectionsTree(self):
+        # the sections of every root menu are saved together, so that opening one
+        # of them after the first costs no request
+        key = 'accedo://sections'
+        if self.__cache is not None:
+            cached = self.__cache.get(key)
+            if cached is not None:
+                tree = self.__loadJson(cached.body)
+                if tree is not None:
+                    self.trace.hit(key, len(cached.body))
+                    return tree
         self.__getAPISession()
-        jsn = self.getJson(
-            "https://api.one.accedo.tv/content/entry/{eid}?locale=it".format(eid=eid))
-        if jsn and "components" in jsn:
-            eid = quote(",".join(jsn["components"]))
-            jsn = self.getJson(
-                "https://api.one.accedo.tv/content/entries?id={eid}&locale=it".format(eid=eid))
-            if jsn and 'entries' in jsn:
-                return jsn['entries']
-        return False
-
-    def __createMediasetUrl(self, base, pageels=None, page=None, args=None, passkeys=True):
+        roots = self.__getAccedoEntries(list(self.ACCEDO_ENTRIES))
+        if not roots:
+            return {}
+        components = []
+        for root in roots:
+            components.extend(c for c in root.get('components', []) if c not in components)
+        entries = self.__getAccedoEntries(components) if components else []
+        if entries is None:
+            return {}
+        byid = {e['_meta']['id']: e for e in entries if '_meta' in e and 'id' in e['_meta']}
+        tree = {}
+        for root in roots:
+            if '_meta' in root and 'id' in root['_meta']:
+                tree[root['_meta']['id']] = [byid[c] for c in root.get('components', [])
+                                             if c in byid]
+        if self.__cache is not None:
+            self.__cache.set(key, json.dumps(tree), self.ACCEDO_SECTIONS_TTL)
+        return tree
+
+    def __createMediasetUrl(self, base, pageels=None, page=None, args=None):
         if args is None:
             args = {}
         if pageels and 'hitsPerPage' not in args:
@@ -298,10 +574,6 @@ class Mediaset(rutils.RUtils):
             args['page'] = str(page)
         if 'page' not in args and 'hitsPerPage' in args:
             args['page'] = '1'
-        if passkeys and self.__tracecid:
-            args['traceCid'] = self.__tracecid
-        if passkeys and self.__cwid:
-            args['cwId'] = self.__cwid
         return self.__create_url(base, args)
 
     def __create_url(self, url, args=None):
@@ -325,7 +597,7 @@ class Mediaset(rutils.RUtils):
     def OttieniTutto(self, inonda=None, pageels=100, page=None):
         self.log('Trying to get the full program list', 4)
         url = self.__createAZUrl(inonda=inonda, pageels=pageels, page=page)
-        return self.__getElsFromUrl(url)
+        return self.__getElsFromUrl(url, auth=True, stream=True)
 
     def OttieniTuttoLettera(self, lettera, inonda=None, pageels=100, page=None):
         self.log('Trying to get the full program list with letter {}'.format(lettera), 4)
@@ -334,17 +606,17 @@ class Mediaset(rutils.RUtils):
         else:
             query = 'TitleFullSearch:' + lettera + '*'
         url = self.__createAZUrl(query=query, inonda=inonda, pageels=pageels, page=page)
-        return self.__getElsFromUrl(url)
+        return self.__getElsFromUrl(url, auth=True, stream=True)
 
     def OttieniTuttiProgrammi(self, inonda=None, pageels=100, page=None):
         self.log('Trying to get the tv program list', 4)
         url = self.__createAZUrl(["Programmi Tv"], inonda=inonda, pageels=pageels, page=page)
-        return self.__getElsFromUrl(url)
+        return self.__getElsFromUrl(url, auth=True, stream=True)
 
     def OttieniTutteFiction(self, inonda=None, pageels=100, page=None):
         self.log('Trying to get the fiction list', 4)
         url = self.__createAZUrl(["Fiction"], inonda=inonda, pageels=pageels, page=page)
-        return self.__getElsFromUrl(url)
+        return self.__getElsFromUrl(url, auth=True, stream=True)
 
     def OttieniCategorieProgrammi(self):
         self.log('Trying to get the programs sections list', 4)
@@ -357,7 +629,7 @@ class Mediaset(rutils.RUtils):
     def OttieniFilm(self, inonda=None, pageels=100, page=None):
         self.log('Trying to get the movie list', 4)
         url = self.__createAZUrl(["Cinema"], inonda=inonda, pageels=pageels, page=page)
-        return self.__getElsFromUrl(url)
+        return self.__getElsFromUrl(url, auth=True, stream=True)
 
     def OttieniGeneriFilm(self):
         self.log('Trying to get the movie sections list', 4)
@@ -365,39 +637,36 @@ class Mediaset(rutils.RUtils):
 
     def OttieniFilmPerTipo(self, catcode, pageels=24, page=1):
         self.log('Trying to get the movie list', 4)
-        url = f"https://api-ott-prod-fe.mediaset.net/PROD/play/reco/anonymous/v2.0?uxReference={catcode}&shortId=&query=&params=&contentId=&sid=62b41c3e-e72f-4b49-ac50-499b764b1d01&property=play&tenant=play-prod-v2&userContext=iwiAeyJwbGF0Zm9ybSI6IndlYiJ9Aw%3D%3D&aresContext=&clientId=G00ACCwObNtI1hELC00Y%2F1lLGLO9DiMr61MsOinSApNJaWtOOU0CpThpZXaiw8YYOJa0mtUNXCoONJ7UmP4IHgM%3D&page={page}&hitsPerPage={pageels}"
-        return self.__getElsFromUrlV2(url)
+        return self.__reco.items(uxReference=catcode, pageels=pageels, page=page)
 
     def OttieniFilmPerId(self, id, pageels=10, page=1):
         self.log('Trying to get the movie list', 4)
-        eid = quote(id)
-        url = f"https://api-ott-prod-fe.mediaset.net/PROD/play/reco/anonymous/v2.0?uxReference=&shortId={eid}&query=&params=&contentId=&sid=62b41c3e-e72f-4b49-ac50-499b764b1d01&property=play&tenant=play-prod-v2&userContext=iwiAeyJwbGF0Zm9ybSI6IndlYiJ9Aw%3D%3D&aresContext=&clientId=G00ACCwObNtI1hELC00Y%2F1lLGLO9DiMr61MsOinSApNJaWtOOU0CpThpZXaiw8YYOJa0mtUNXCoONJ7UmP4IHgM%3D&page={page}&hitsPerPage={pageels}"
-        return self.__getElsFromUrlV2(url)
+        return self.__reco.items(shortId=id, pageels=pageels, page=page)
 
     def __OttieniBlocchi(self, catcode, pageels=15, page=1):
         self.log('Trying to get the movie categories list', 4)
-        url = f"https://api-ott-prod-fe.mediaset.net/PROD/play/reco/anonymous/v2.0?uxReference={catcode}&shortId=&query=&params=&contentId=&sid=62b41c3e-e72f-4b49-ac50-499b764b1d01&property=play&tenant=play-prod-v2&userContext=iwiAeyJwbGF0Zm9ybSI6IndlYiJ9Aw%3D%3D&aresContext=&clientId=G00ACCwObNtI1hELC00Y%2F1lLGLO9DiMr61MsOinSApNJaWtOOU0CpThpZXaiw8YYOJa0mtUNXCoONJ7UmP4IHgM%3D&page={page}&hitsPerPage={pageels}"
-        return self.__getCatsFromUrlV2(url, catcode)
+        return self.__reco.categories(catcode, pageels=pageels, page=page)
 
     def OttieniBlocchiFilm(self):
-        catcodes24 = ["filmPiuVisti24H", "filmUltimiArrivi",
-                      "tvodPiuNoleggiati", "chnlsMovieMostRecentParamsChannel"]
-        catcodes15 = ["filmClustering", "multipleBlockFilm"]
+        catcodes = [("filmPiuVisti24H", 24), ("filmUltimiArrivi", 24),
+                    ("tvodPiuNoleggiati", 24), ("chnlsMovieMostRecentParamsChannel", 24),
+                    ("filmClustering", 15), ("multipleBlockFilm", 15)]
+        results = map_parallel(lambda c: self.__OttieniBlocchi(c[0], pageels=c[1]),
+                               catcodes, log=self.log)
         cats = []
-        for catcode in catcodes24:
-            catl, _ = self.__OttieniBlocchi(catcode, pageels=24)
-            if catl:
-                cats.extend(catl)
-        for catcode in catcodes15:
-            catl, _ = self.__OttieniBlocchi(catcode, pageels=15)
-            if catl:
-                cats.extend(catl)
+        seen = set()
+        for res in results:
+            for cat in (res[0] if res and res[0] else []):
+                key = (cat.get('id'), cat.get('code'), cat['title'])
+                if key not in seen:
+                    seen.add(key)
+                    cats.append(cat)
         return cats
 
     def OttieniKids(self, inonda=None, pageels=100, page=None):
         self.log('Trying to get the kids list', 4)
         url = self.__createAZUrl(["Kids"], inonda=inonda, pageels=pageels, page=page)
-        return self.__getElsFromUrl(url)
+        return self.__getElsFromUrl(url, auth=True, stream=True)
 
     def OttieniGeneriKids(self):
         self.log('Trying to get the kids sections list', 4)
@@ -406,7 +675,7 @@ class Mediaset(rutils.RUtils):
     def OttieniDocumentari(self, inonda=None, pageels=100, page=None):
         self.log('Trying to get the movie list', 4)
         url = self.__createAZUrl(["Documentari"], inonda=inonda, pageels=pageels, page=page)
-        return self.__getElsFromUrl(url)
+        return self.__getElsFromUrl(url, auth=True, stream=True)
 
     def OttieniGeneriDocumentari(self):
         self.log('Trying to get the movie sections list', 4)
@@ -417,12 +686,12 @@ class Mediaset(rutils.RUtils):
         url = self.__createMediasetUrl(
             "https://api-ott-prod-fe.mediaset.net/PROD/play/rec2/cataloguelisting/v1.0",
             pageels=pageels, page=page, args={'platform': 'pc', 'uxReference': self.uxReferenceMapping[gid]})
-        return self.__getElsFromUrl(url)
+        return self.__getElsFromUrl(url, auth=True, stream=True)
 
     def OttieniStagioni(self, seriesId, sort=None, erange=None):
         self.log('Trying to get the seasons from series id {}'.format(seriesId), 4)
         url = 'https://feed.entertainment.tv.theplatform.eu/f/PR1GhC/mediaset-prod-tv-seasons/feed'
-        args = {'bySeriesId': seriesId}
+        args = {'bySeriesId': seriesId, 'fields': ','.join(FEED_FIELDS['seasons'])}
         if sort:
             args['sort'] = sort
         if erange:
@@ -432,7 +701,8 @@ class Mediaset(rutils.RUtils):
     def OttieniSezioniProgramma(self, brandId, sort=None, erange=None):
         self.log('Trying to get the sections from brand id {}'.format(brandId), 4)
         url = 'https://feed.entertainment.tv.theplatform.eu/f/PR1GhC/mediaset-prod-all-brands?'
-        args = {'byCustomValue': '{{brandId}}{{{brandId}}}'.format(brandId=brandId)}
+        args = {'byCustomValue': '{{brandId}}{{{brandId}}}'.format(brandId=brandId),
+                'fields': ','.join(FEED_FIELDS['brands'])}
         if sort:
             args['sort'] = sort
         if erange:
@@ -442,17 +712,18 @@ class Mediaset(rutils.RUtils):
     def OttieniVideoSezione(self, subBrandId, sort=None, erange=None):
         self.log('Trying to get the videos from section {}'.format(subBrandId), 4)
         url = 'https://feed.entertainment.tv.theplatform.eu/f/PR1GhC/mediaset-prod-all-programs'
-        args = {'byCustomValue': '{{subBrandId}}{{{subBrandId}}}'.format(subBrandId=subBrandId)}
+        args = {'byCustomValue': '{{subBrandId}}{{{subBrandId}}}'.format(subBrandId=subBrandId),
+                'fields': ','.join(FEED_FIELDS['programs'])}
         if sort:
             args['sort'] = sort
         if erange:
             args['range'] = erange
-        return self.__getEntriesFromUrl(url, args)
+        return self.__getEntriesFromUrl(url, args, stream=True)
 
     def OttieniCanaliLive(self, sort=None, erange=None):
         self.log('Trying to get the live channels list', 4)
         url = ('https://feed.entertainment.tv.theplatform.eu/f/PR1GhC/mediaset-prod-all-stations?')
-        args = {}
+        args = {'fields': ','.join(FEED_FIELDS['stations'])}
         if sort:
             args['sort'] = sort
         if erange:
@@ -465,18 +736,48 @@ class Mediaset(rutils.RUtils):
             args['uxReference'] = self.uxReferenceMapping[section]
         url = self.__createMediasetUrl(
             'https://api-ott-prod-fe.mediaset.net/PROD/play/rec2/search/v1.0', pageels=pageels, page=page, args=args)
-        return self.__getElsFromUrl(url)
+        return self.__getElsFromUrl(url, auth=True, stream=True)
+
+    def OttieniGiorniGuidaTV(self, days=16):
+        # start and finish of the days listed in the guide, from today going back
+        today = staticutils.get_date_from_timestamp(staticutils.get_timestamp_midnight())
+        res = []
+        for d in range(0, days):
+            start = staticutils.get_timestamp_midnight(today - timedelta(days=d))
+            res.append((start, start + 86399999))  # 86399999 is one day minus 1 ms
+        return res
+
+    def OttieniGuidaTV(self, chid, start, finish, days=None):
+        if self.__epg is not None and self.__epg.covers(chid, start, finish):
+            return {'listings': self.__epg.listings(chid, start, finish)}
+        ranges = [(start, finish)]
+        if days and days[-1][0] <= start and finish <= days[0][1]:
+            # get every missing day of the guide with the same request, the store
+            # keeps them split by day so the next ones won't need a request
+            missing = [d for d in days
+                       if self.__epg is None or not self.__epg.covers(chid, d[0], d[1])]
+            if not [d for d in missing if d[0] <= finish and d[1] >= start]:
+                return {'listings': self.__epg.listings(chid, start, finish)}
+            ranges = [d for d in days if min(missing)[0] <= d[0] and d[1] <= max(missing)[1]]
+        res = self.__scaricaGuidaTV(chid, min(ranges)[0], max(ranges)[1], ranges)
+        if res and 'listings' in res and len(ranges) > 1:
+            res = dict(res)
+            res['listings'] = [el for el in res['listings']
+                               if el['startTime'] <= finish and el['endTime'] >= start]
+        return res
 
-    def OttieniGuidaTV(self, chid, start, finish):
+    def __scaricaGuidaTV(self, chid, start, finish, ranges):
         self.log(('Trying to get the tv guide from {} channel '
                   'starting {} finishing {}').format(chid, str(start), str(finish)), 4)
         args = {'byCallSign': chid, 'byListingTime': '{s}~{f}'.format(s=str(start), f=str(finish))}
         url = self.__createMediasetUrl(
             "https://api-ott-prod-fe.mediaset.net/PROD/play/alive/allListingFeedEpg/v1.0?",
             pageels=None, page=None, args=args)
-        res = self.__getElsFromUrl(url)
+        res = self.__getElsFromUrl(url, auth=True)
         if res is not None:
             if res and res[0]:
+                if self.__epg is not None and 'listings' in res[0][0]:
+                    self.__epg.store(chid, res[0][0]['listings'], ranges)
                 return res[0][0]
             return {}
         return res
@@ -484,13 +785,33 @@ class Mediaset(rutils.RUtils):
     def OttieniProgrammiLive(self, sort=None):
         self.log('Trying to get the live programs', 4)
         now = staticutils.get_timestamp()
+        if self.__epg is not None and not sort:
+            res = self.__ottieniProgrammiLiveLocali(now)
+            if res:
+                return res
         args = {'byListingTime': '{s}~{f}'.format(s=str(now - 1001), f=str(now))}
         if sort:
             args['sort'] = sort
         url = self.__createMediasetUrl(
             "https://feed.entertainment.tv.theplatform.eu/f/PR1GhC/mediaset-prod-all-listings?",
-            pageels=None, page=None, args=args, passkeys=False)
-        return self.__getEntriesFromUrl(url)
+            pageels=None, page=None, args=args)
+        res = self.__getEntriesFromUrl(url)
+        if self.__epg is not None and isinstance(res, list):
+            chans = [chan for chan in res if chan.get('listings')]
+            for chan in chans:
+                self.__epg.store(chan['guid'], chan['listings'])
+            self.__epg.storeChannels([(chan['guid'], chan['title']) for chan in chans])
+        return res
+
+    def __ottieniProgrammiLiveLocali(self, now):
+        # same format of the live listings feed, if every channel has a listing on air
+        res = []
+        for callSign, title in self.__epg.channels():
+            current, _ = self.__epg.nowNext(callSign, now)
+            if current is None:
+                return None
+            res.append({'guid': callSign, 'title': title, 'listings': [current]})
+        return res
 
     def OttieniLiveStream(self, guid):
         self.log('Trying to get live and rewind channel program of id {}'.format(guid), 4)
@@ -501,12 +822,41 @@ class Mediaset(rutils.RUtils):
         self.log('Trying to get info from guid ' + guid, 4)
         url = ('https://feed.entertainment.tv.theplatform.eu/f/PR1GhC/mediaset-prod-all-programs/'
                'guid/-/{guid}').format(guid=guid)
-        data = self.getJson(url)
+        data = self.__getJson(self.__create_url(url, {'fields': ','.join(FEED_FIELDS['guid'])}))
         if data and 'isException' not in data:
             return data
         return False
 
     def OttieniDatiVideo(self, pid, live=False):
+        key = self.__videoKey(pid, live)
+        res = self.__videostore.get(key)
+        if res:
+            self.log('Using saved video data of pid ' + pid, 4)
+            self.trace.hit('https://link.theplatform.eu/' + key)
+            return res
+        res = self.__scaricaDatiVideo(pid, live)
+        ttl = self.__videoDataTtl(res['url'])
+        if ttl > 0:
+            self.__videostore.set(key, res, ttl)
+        return res
+
+    def DimenticaDatiVideo(self, pid, live=False):
+        # the saved stream didn't play, the next play resolves it again
+        self.__videostore.delete(self.__videoKey(pid, live))
+
+    @staticmethod
+    def __videoKey(pid, live):
+        return '{}:{}'.format('live' if live else 'vod', pid)
+
+    def __videoDataTtl(self, url):
+        if not url:
+            return 0
+        expiries = [int(e) for e in self.VIDEO_EXPIRY.findall(unquote(url))]
+        if not expiries:
+            return self.VIDEO_DATA_TTL
+        return min(min(expiries) - time.time() - self.VIDEO_DATA_MARGIN, self.VIDEO_DATA_MAX_TTL)
+
+    def __scaricaDatiVideo(self, pid, live):
         self.log('Trying to get video data from pid ' + pid, 4)
         u = 'https://link.theplatform.eu/s/PR1GhC/'
         if not live:
@@ -515,24 +865,13 @@ class Mediaset(rutils.RUtils):
                     '&assetTypes=HD,browser,widevine,geoIT|geoNo:HD,browser,geoIT|geoNo:HD,'
                     'geoIT|geoNo:SD,''browser,widevine,geoIT|geoNo:SD,browser,geoIT|geoNo:SD,'
                     'geoIT|geoNo')
-        text = self.getText(u)
-        res = {'url': '', 'pid': '', 'type': '', 'security': False}
-        root = ET.fromstring(text)
-        for vid in root.findall('.//{http://www.w3.org/2005/SMIL21/Language}switch'):
-            ref = vid.find('./{http://www.w3.org/2005/SMIL21/Language}ref')
-            res['url'] = ref.attrib['src']
-            res['type'] = ref.attrib['type']
-            if 'security' in ref.attrib and ref.attrib['security'] == 'commonEncryption':
-                res['security'] = True
-            par = ref.find(
-                './{http://www.w3.org/2005/SMIL21/Language}param[@name="trackingData"]')
-            if par is not None:
-                for item in par.attrib['value'].split('|'):
-                    [attr, value] = item.split('=', 1)
-                    if attr == 'pid':
-                        res['pid'] = value
-                        break
-            break
+        from resources.lib.smil import SmilPolicy, resolve
+        best, candidates = resolve(self.getText(u), SmilPolicy(max_height=self.videoMaxHeight))
+        res = {'url': '', 'pid': '', 'type': '', 'security': False,
+               # every stream found, for a fallback that doesn't download the SMIL again
+               'candidates': [dict(c._asdict()) for c in candidates]}
+        if best is not None:
+            res.update(url=best.url, pid=best.pid, type=best.type, security=best.security)
         return res
 
     def OttieniWidevineAuthUrl(self, uid):
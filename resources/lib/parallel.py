@@ -0,0 +1,28 @@
+MAX_WORKERS = 6
+
+
+def map_parallel(func, items, workers=MAX_WORKERS, log=None):
+    """Call ``func`` on every item using a bounded pool of threads.
+
+    Results are returned in the same order as ``items``. A call raising an
+    exception is logged and gives ``None`` so the others are still used.
+    """
+    items = list(items)
+    if not items:
+        return []
+    if len(items) == 1:
+        workers = 1
+
+    def run(item):
+        try:
+            return func(item)
+        except Exception as e:  # pylint: disable=broad-except
+            if log:
+                log('Parallel request for {} failed: {}'.format(item, e), 4)
+            return None
+
+    if workers <= 1:
+        return [run(item) for item in items]
+    from concurrent.futures import ThreadPoolExecutor
+    with ThreadPoolExecutor(max_workers=min(workers, len(items))) as executor:
+        return list(executor.map(run, items))
@@ -0,0 +1,74 @@
+from collections import OrderedDict
+try:
+    from urllib.parse import urlencode
+except ImportError:
+    from urllib import urlencode
+
+
+class RecoV2(object):
+    """Client for the reco/anonymous/v2.0 endpoint used by the movie pages.
+
+    ``getjson`` is the function used to download an url, it's expected to
+    take care of the api keys and of the preflight request.
+    """
+
+    URL = 'https://api-ott-prod-fe.mediaset.net/PROD/play/reco/anonymous/v2.0'
+    ARGS = OrderedDict([
+        ('uxReference', ''), ('shortId', ''), ('query', ''), ('params', ''), ('contentId', ''),
+        ('sid', '62b41c3e-e72f-4b49-ac50-499b764b1d01'), ('property', 'play'),
+        ('tenant', 'play-prod-v2'), ('userContext', 'iwiAeyJwbGF0Zm9ybSI6IndlYiJ9Aw=='),
+        ('aresContext', ''),
+        ('clientId', ('G00ACCwObNtI1hELC00Y/1lLGLO9DiMr61MsOinSApNJaWtOOU0CpThpZXaiw8YYOJa0mtUN'
+                      'XCoONJ7UmP4IHgM=')),
+    ])
+
+    def __init__(self, getjson):
+        self.__getjson = getjson
+
+    def url(self, uxReference='', shortId='', pageels=24, page=1):
+        args = OrderedDict(self.ARGS)
+        args['uxReference'] = uxReference
+        args['shortId'] = shortId
+        args['page'] = page
+        args['hitsPerPage'] = pageels
+        return self.URL + '?' + urlencode(args)
+
+    def __getBlocks(self, url):
+        data = self.__getjson(url)
+        if not data or not data.get('isOk') or 'pagination' not in data.get('response', {}):
+            return None, False
+        response = data['response']
+        hasMore = response['pagination'].get('hasNextPage', False)
+        if 'blocks' not in response:
+            return None, hasMore
+        return response['blocks'], hasMore
+
+    def items(self, uxReference='', shortId='', pageels=24, page=1):
+        blocks, hasMore = self.__getBlocks(self.url(uxReference, shortId, pageels, page))
+        if blocks is None:
+            return None, hasMore
+        res = []
+        seen = set()
+        for b in blocks:
+            for item in b.get('items', []):
+                # the same item can be in more than one block
+                key = item.get('guid') or item.get('id')
+                if key:
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                res.append(item)
+        return res, hasMore
+
+    def categories(self, uxReference, pageels=15, page=1):
+        blocks, hasMore = self.__getBlocks(self.url(uxReference, '', pageels, page))
+        if blocks is None:
+            return None, hasMore
+        res = []
+        for b in blocks:
+            if 'title' in b:
+                if '_viewAll' in b:
+                    res.append({'id': b['_viewAll'], 'title': b['title']})
+                else:
+                    res.append({'code': uxReference, 'title': b['title']})
+        return res, hasMore
@@ -0,0 +1,95 @@
+import io
+import xml.etree.ElementTree as ET
+from collections import namedtuple
+
+SMIL_NS = '{http://www.w3.org/2005/SMIL21/Language}'
+
+Candidate = namedtuple('Candidate', ['url', 'type', 'security', 'pid', 'height', 'usable'])
+
+
+class SmilPolicy(object):
+    """Order of preference of the streams listed in a SMIL document.
+
+    Streams without DRM come first when ``prefer_clear`` is set, then the
+    ones whose type comes first in ``types``, streams taller than
+    ``max_height`` (0 for no limit) are used only when there is nothing
+    else. Streams of a type not in ``types`` can't be played and rank with
+    the placeholder ones. Equal streams keep the order of the document.
+    """
+
+    def __init__(self, prefer_clear=True, types=('application/dash+xml', 'video/mp4'),
+                 max_height=0):
+        self.prefer_clear = prefer_clear
+        self.types = types
+        self.max_height = max_height
+
+    def rank(self, cand):
+        over = bool(self.max_height and cand.height and cand.height > self.max_height)
+        drm = self.prefer_clear and cand.security
+        kind = self.types.index(cand.type) if cand.type in self.types else len(self.types)
+        return (not cand.usable or kind == len(self.types), over, drm, kind)
+
+    def playable(self, cand):
+        return not self.rank(cand)[0]
+
+    def top(self, cand):
+        # nothing later in the document can be better than this
+        return self.rank(cand) == (False, False, False, 0)
+
+
+def _candidate(ref):
+    pid = ''
+    usable = True
+    for par in ref.iter(SMIL_NS + 'param'):
+        name = par.get('name')
+        if name == 'trackingData':
+            for item in par.get('value', '').split('|'):
+                attr, _, value = item.partition('=')
+                if attr == 'pid':
+                    pid = value
+                    break
+        elif name in ('exception', 'isException'):
+            # geo blocked or expired, the url is a placeholder video
+            usable = False
+    try:
+        height = int(ref.get('height') or 0)
+    except ValueError:
+        height = 0
+    return Candidate(ref.get('src', ''), ref.get('type', ''),
+                     ref.get('security') == 'commonEncryption', pid, height, usable)
+
+
+def pick(candidates, policy):
+    """Return the preferred playable stream of ``candidates``, ``None`` if none is."""
+    playable = [c for c in candidates if policy.playable(c)]
+    return min(playable, key=policy.rank) if playable else None
+
+
+def resolve(text, policy=None):
+    """Return the preferred stream of a SMIL document and the ones parsed.
+
+    The document is parsed incrementally and the parsing stops at the first
+    stream the policy can't improve on, so the candidates are the streams
+    found up to that one, in document order. Returns ``(None, [])`` when
+    the document has no stream or can't be parsed.
+    """
+    policy = policy or SmilPolicy()
+    if not isinstance(text, bytes):
+        text = (text or '').encode('utf-8')
+    candidates = []
+    try:
+        for _, elem in ET.iterparse(io.BytesIO(text), events=('end',)):
+            if elem.tag != SMIL_NS + 'ref':
+                continue
+            cand = _candidate(elem)
+            elem.clear()
+            if not cand.url:
+                continue
+            candidates.append(cand)
+            if policy.top(cand):
+                break
+    except ET.ParseError:
+        pass
+    if not candidates:
+        return None, []
+    return min(candidates, key=policy.rank), candidates
@@ -0,0 +1,186 @@
+import threading
+import time
+from collections import namedtuple
+try:
+    from urllib.parse import urlsplit
+except ImportError:
+    from urlparse import urlsplit
+
+
+TraceRecord = namedtuple('TraceRecord', ['method', 'family', 'status', 'size', 'latency',
+                                         'cached'])
+
+# (url pattern, endpoint family), the first matching pattern wins
+FAMILIES = (
+    ('/azlisting/', 'azlisting'),
+    ('/cataloguelisting/', 'cataloguelisting'),
+    ('/search/', 'search'),
+    ('/reco/', 'reco'),
+    ('/allListingFeedEpg/', 'epg'),
+    ('/idm/', 'login'),
+    ('/nownext/', 'nownext'),
+    ('accedo', 'accedo'),
+    ('login.mediaset.it/', 'gigya'),
+    ('/mediaset-prod-all-brands', 'brands'),
+    ('/mediaset-prod-all-listings', 'listings'),
+    ('/mediaset-prod-all-programs', 'programs'),
+    ('/mediaset-prod-all-stations', 'stations'),
+    ('/mediaset-prod-tv-seasons', 'seasons'),
+    ('link.theplatform.eu/', 'smil'),
+)
+
+
+def endpoint_family(url):
+    for pattern, family in FAMILIES:
+        if pattern in url:
+            return family
+    return urlsplit(url).netloc
+
+
+def percentile(values, pct):
+    # nearest rank of sorted values
+    if not values:
+        return None
+    return values[max(0, min(len(values) - 1, int(round(pct / 100.0 * len(values))) - 1))]
+
+
+class RequestTrace(object):
+    """Record of the http requests made during a plugin invocation.
+
+    ``hook`` is installed as a response hook of the requests session, so it
+    sees every request whatever method of the session made it; the time
+    includes reading the body. Answers taken from the cache are recorded
+    with ``hit``.
+    """
+
+    def __init__(self):
+        self.records = []
+        self.__lock = threading.Lock()
+
+    def hook(self, res, *args, **kwargs):
+        start = time.time()
+        size = len(res.content or b'')
+        latency = res.elapsed.total_seconds() + time.time() - start
+        self.__add(TraceRecord(res.request.method, endpoint_family(res.url), res.status_code,
+                               size, latency, False))
+
+    def hit(self, url, size=0):
+        self.__add(TraceRecord('GET', endpoint_family(url), 200, size, 0.0, True))
+
+    def __add(self, record):
+        with self.__lock:
+            self.records.append(record)
+
+    @property
+    def requests(self):
+        return sum(1 for r in self.records if not r.cached)
+
+    @property
+    def bytes(self):
+        return sum(r.size for r in self.records if not r.cached)
+
+    def summary(self):
+        families = {}
+        for r in self.records:
+            fam = families.setdefault(r.family, [0, 0, 0, 0.0])
+            if r.cached:
+                fam[1] += 1
+            else:
+                fam[0] += 1
+                fam[2] += r.size
+                fam[3] += r.latency
+        parts = ['{}: {} requests, {} cached, {} bytes, {:.3f}s'.format(name, *fam)
+                 for name, fam in sorted(families.items(), key=lambda f: -f[1][3])]
+        return '{} requests, {} bytes{}{}'.format(self.requests, self.bytes,
+                                                  ' | ' if parts else '', ' | '.join(parts))
+
+
+class TraceStore(object):
+    """Latest request records of every endpoint family, kept across invocations.
+
+    Only the last ``MAX_SAMPLES`` records of each family are kept, so the
+    statistics follow the recent behaviour of the endpoints.
+    """
+
+    SCHEMA_VERSION = 1
+    MAX_SAMPLES = 500
+
+    def __init__(self, path):
+        self.path = path
+        self.__conn = None
+        self.__lock = threading.RLock()
+
+    def __connect(self):
+        import sqlite3
+        if self.__conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            if conn.execute('PRAGMA user_version').fetchone()[0] != self.SCHEMA_VERSION:
+                conn.execute('DROP TABLE IF EXISTS samples')
+                conn.execute('PRAGMA user_version = {}'.format(self.SCHEMA_VERSION))
+            conn.execute('CREATE TABLE IF NOT EXISTS samples ('
+                         'family TEXT NOT NULL, cached INTEGER NOT NULL, status INTEGER, '
+                         'size INTEGER NOT NULL, latency REAL NOT NULL, at REAL NOT NULL)')
+            conn.execute('CREATE INDEX IF NOT EXISTS samples_family ON samples (family)')
+            self.__conn = conn
+        return self.__conn
+
+    def add(self, records):
+        if not records:
+            return
+        import sqlite3
+        now = time.time()
+        with self.__lock:
+            try:
+                conn = self.__connect()
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    conn.executemany('INSERT INTO samples (family, cached, status, size, latency, at) '
+                                     'VALUES (?, ?, ?, ?, ?, ?)',
+                                     [(r.family, int(r.cached), r.status, r.size, r.latency, now)
+                                      for r in records])
+                    for family in set(r.family for r in records):
+                        conn.execute('DELETE FROM samples WHERE family = ? AND rowid NOT IN '
+                                     '(SELECT rowid FROM samples WHERE family = ? '
+                                     'ORDER BY rowid DESC LIMIT ?)',
+                                     (family, family, self.MAX_SAMPLES))
+                    conn.execute('COMMIT')
+                except sqlite3.Error:
+                    conn.execute('ROLLBACK')
+                    raise
+            except sqlite3.Error:
+                pass
+
+    def stats(self):
+        """Return ``(family, requests, hit rate, p50, p90, p99, mean bytes)`` by family.
+
+        Latencies are in seconds and only count the requests that reached
+        the network, the hit rate is the share of answers from the cache.
+        """
+        import sqlite3
+        with self.__lock:
+            try:
+                rows = self.__connect().execute(
+                    'SELECT family, cached, size, latency FROM samples').fetchall()
+            except sqlite3.Error:
+                return []
+        families = {}
+        for family, cached, size, latency in rows:
+            fam = families.setdefault(family, [[], [], 0])
+            if cached:
+                fam[2] += 1
+            else:
+                fam[0].append(latency)
+                fam[1].append(size)
+        stats = []
+        for family in sorted(families):
+            latencies, sizes, hits = families[family]
+            latencies.sort()
+            total = len(latencies) + hits
+            stats.append((family, total, float(hits) / total,
+                          percentile(latencies, 50), percentile(latencies, 90),
+                          percentile(latencies, 99),
+                          sum(sizes) / len(sizes) if sizes else 0))
+        return stats
@@ -1,20 +1,124 @@
 # -*- coding: utf-8 -*-
+import os
+import sys
+import time
 from datetime import timedelta
-from resources.lib.mediaset import Mediaset
-from resources.mediaset_datahelper import _gather_info, _gather_art, _gather_media_type
+from resources.lib.keystore import KeyStore
+from resources.lib.parallel import map_parallel
+from resources.mediaset_datahelper import (_gather_info, _gather_art, _gather_media_type,
+                                          ProgramItem)
 from phate89lib import kodiutils, staticutils  # pylint: disable=import-error
+import xbmcplugin  # pylint: disable=import-error
+
+
+def _profile_path():
+    import xbmcaddon  # pylint: disable=import-error
+    import xbmcvfs  # pylint: disable=import-error
+    path = xbmcvfs.translatePath(xbmcaddon.Addon().getAddonInfo('profile'))
+    if not os.path.isdir(path):
+        os.makedirs(path)
+    return path
+
+
+class DirectoryItems(object):
+    """Items of the listing being built.
+
+    The items are made by ``kodiutils.addListItem`` as usual, but the
+    ``addDirectoryItem`` call it ends with is collected: ``end`` passes the
+    items to Kodi all together with a single ``addDirectoryItems`` call
+    instead of one call per item.
+
+    This relies on phate89lib calling ``xbmcplugin.addDirectoryItem``
+    through the module: the collector takes its place from the first
+    ``add`` until the items are handed over, and ``restore`` puts it back
+    if the listing is never ended.
+    """
+
+    def __init__(self):
+        self.items = []
+        self.__add = None
+
+    def __collect(self, handle, url, listitem, isFolder=False, totalItems=0):
+        self.items.append((url, listitem, isFolder))
+        return True
+
+    def add(self, label="", params=None, videoInfo=None, arts=None, isFolder=True):
+        if self.__add is None:
+            self.__add = xbmcplugin.addDirectoryItem
+            xbmcplugin.addDirectoryItem = self.__collect
+        kwargs = {'isFolder': isFolder}
+        if videoInfo is not None:
+            kwargs['videoInfo'] = videoInfo
+        if arts is not None:
+            kwargs['arts'] = arts
+        kodiutils.addListItem(label, params, **kwargs)
+
+    def restore(self):
+        if self.__add is not None:
+            xbmcplugin.addDirectoryItem = self.__add
+            self.__add = None
+
+    def flush(self):
+        self.restore()
+        if self.items:
+            xbmcplugin.addDirectoryItems(int(sys.argv[1]), self.items, len(self.items))
+            self.items = []
+
+    def end(self):
+        self.flush()
+        kodiutils.endScript()
 
 
 class KodiMediaset(object):
 
+    # modes that may be rendered from expired cached listings
+    STALE_MODES = ('tutto', 'fiction', 'programmi', 'film', 'kids', 'documentari',
+                   'cerca', 'sezione', 'sezioneV2', 'programma')
+    # profiles kept when profiling is enabled and calls shown in the log
+    MAX_PROFILES = 20
+    PROFILE_TOP = 25
+    # free memory in MB needed to download the next page of a listing in advance
+    PREFETCH_MIN_MEMORY = 256
+    # seconds the download of the next page may take, checking for abort every PREFETCH_POLL
+    PREFETCH_TIMEOUT = 30
+    PREFETCH_POLL = 0.1
+    # manifest type of inputstream.adaptive for the stream types of the SMIL
+    MANIFEST_TYPES = {'application/dash+xml': 'mpd', 'application/x-mpegURL': 'hls'}
+    # seconds a playback error is attributed to the last resolved video
+    PLAY_ERROR_TTL = 6 * 60 * 60
+    # seconds the season and section opened in a show are remembered
+    DRILL_DOWN_TTL = 30 * 24 * 60 * 60
+
     def __init__(self):
-        self.med = Mediaset()
-        self.med.log = kodiutils.log
+        profile = _profile_path()
+        self.profile = profile
+        self.__med = None
+        self.__staleview = False
+        self.__successiva = None
+        self.playstore = KeyStore(os.path.join(profile, 'playback.json'))
+        self.drillstore = KeyStore(os.path.join(profile, 'drilldown.json'))
+        self.elenco = DirectoryItems()
         self.iperpage = int(kodiutils.getSetting('itemsperpage'))
         self.ua = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
             '(KHTML, like Gecko) Chrome/116.0.5845.96 Safari/537.36')
 
 
+    @property
+    def med(self):
+        # created on first use, the menus without requests don't load the api modules
+        if self.__med is None:
+            from resources.lib.mediaset import Mediaset
+            self.__med = Mediaset(self.profile,
+                                  int(kodiutils.getSetting('cachesize') or 0) * 1024 * 1024)
+            self.__med.log = kodiutils.log
+            self.__med.videoMaxHeight = int(kodiutils.getSetting('maxheight') or 0)
+            self.__med.serveStale = self.__staleview
+        return self.__med
+
+    def __tracestore(self):
+        from resources.lib.tracing import TraceStore
+        return TraceStore(os.path.join(self.profile, 'trace.db'))
+
     def __imposta_range(self, start):
         limit = '{}-{}'.format(start, start + self.iperpage-1)
         return limit
@@ -23,13 +127,15 @@ class KodiMediaset(object):
         kodiutils.setContent(_gather_media_type(prog) + 's')
 
     def __analizza_elenco(self, progs, setcontent=False, titlewd=False):
+        # progs can be a generator parsing the elements while they are used
+        count = 0
         if not progs:
-            return
-        if setcontent:
-            self.__imposta_tipo_media(progs[0])
+            return count
         for prog in progs:
-            infos = _gather_info(prog, titlewd=titlewd)
-            arts = _gather_art(prog)
+            if setcontent and count == 0:
+                self.__imposta_tipo_media(prog)
+            count += 1
+            item = ProgramItem(prog, titlewd)
             if 'media' in prog:
                 # salta se non ha un media ma ha il tag perchè non riproducibile
                 if prog['media']:
@@ -39,8 +145,8 @@ class KodiMediaset(object):
                         args['pid'] = media['pid']
                     elif 'publicUrl' in media:
                         args['pid'] = media['publicUrl'].split('/')[-1]
-                    kodiutils.addListItem(infos["title"], args,
-                                          videoInfo=infos, arts=arts, isFolder=False)
+                    self.elenco.add(item.infos["title"], args,
+                                    videoInfo=item.infos, arts=item.arts, isFolder=False)
             elif 'tuningInstruction' in prog:
                 data = {'mode': 'live'}
                 if prog['tuningInstruction'] and not prog['mediasetstation$eventBased']:
@@ -50,52 +156,53 @@ class KodiMediaset(object):
                             data['id'] = v['releasePids'][0]
                         else:
                             data['mid'] = v['releasePids'][0]
-                    kodiutils.addListItem(prog["title"], data, videoInfo=infos,
-                                          arts=arts, isFolder=False)
+                    self.elenco.add(prog["title"], data, videoInfo=item.infos,
+                                    arts=item.arts, isFolder=False)
             elif 'mediasetprogram$subBrandId' in prog:
-                kodiutils.addListItem(prog["description"],
-                                      {'mode': 'programma',
-                                       'sub_brand_id': prog['mediasetprogram$subBrandId']},
-                                      videoInfo=infos, arts=arts)
+                self.elenco.add(prog["description"],
+                                {'mode': 'programma',
+                                 'sub_brand_id': prog['mediasetprogram$subBrandId']},
+                                videoInfo=item.infos, arts=item.arts)
             elif 'mediasettvseason$brandId' in prog:
-                kodiutils.addListItem(prog["mediasettvseason$displaySeason"],
-                                      {'mode': 'programma',
-                                       'brand_id': prog['mediasettvseason$brandId']},
-                                      videoInfo=infos, arts=arts)
+                self.elenco.add(prog["mediasettvseason$displaySeason"],
+                                {'mode': 'programma',
+                                 'brand_id': prog['mediasettvseason$brandId']},
+                                videoInfo=item.infos, arts=item.arts)
             elif 'seriesId' in prog:
-                kodiutils.addListItem(prog["title"],
-                                      {'mode': 'programma', 'series_id': prog['seriesId'],
-                                       'title': prog['title']},
-                                      videoInfo=infos, arts=arts)
+                self.elenco.add(prog["title"],
+                                {'mode': 'programma', 'series_id': prog['seriesId'],
+                                 'title': prog['title']},
+                                videoInfo=item.infos, arts=item.arts)
             elif 'id_brand':
-                kodiutils.addListItem(prog["title"],
-                                      {'mode': 'programma',
-                                       'brand_id': prog['id_brand']},
-                                      videoInfo=infos, arts=arts)
+                self.elenco.add(prog["title"],
+                                {'mode': 'programma',
+                                 'brand_id': prog['id_brand']},
+                                videoInfo=item.infos, arts=item.arts)
             else:
-                kodiutils.addListItem(prog["title"],
-                                      {'mode': 'programma',
-                                       'brand_id': prog['mediasetprogram$brandId']},
-                                      videoInfo=infos, arts=arts)
+                self.elenco.add(prog["title"],
+                                {'mode': 'programma',
+                                 'brand_id': prog['mediasetprogram$brandId']},
+                                videoInfo=item.infos, arts=item.arts)
+        return count
 
     def root(self):
         # kodiutils.addListItem(kodiutils.LANGUAGE(32101), {'mode': 'tutto'})
-        kodiutils.addListItem(kodiutils.LANGUAGE(32106), {'mode': 'programmi'})
-        kodiutils.addListItem(kodiutils.LANGUAGE(32102), {'mode': 'fiction'})
-        kodiutils.addListItem(kodiutils.LANGUAGE(32103), {'mode': 'film'})
-        kodiutils.addListItem(kodiutils.LANGUAGE(32104), {'mode': 'kids'})
-        kodiutils.addListItem(kodiutils.LANGUAGE(32105), {'mode': 'documentari'})
-        kodiutils.addListItem(kodiutils.LANGUAGE(32111), {'mode': 'canali_live'})
-        kodiutils.addListItem(kodiutils.LANGUAGE(32113), {'mode': 'guida_tv'})
-        kodiutils.addListItem(kodiutils.LANGUAGE(32107), {'mode': 'cerca'})
-        kodiutils.endScript()
+        self.elenco.add(kodiutils.LANGUAGE(32106), {'mode': 'programmi'})
+        self.elenco.add(kodiutils.LANGUAGE(32102), {'mode': 'fiction'})
+        self.elenco.add(kodiutils.LANGUAGE(32103), {'mode': 'film'})
+        self.elenco.add(kodiutils.LANGUAGE(32104), {'mode': 'kids'})
+        self.elenco.add(kodiutils.LANGUAGE(32105), {'mode': 'documentari'})
+        self.elenco.add(kodiutils.LANGUAGE(32111), {'mode': 'canali_live'})
+        self.elenco.add(kodiutils.LANGUAGE(32113), {'mode': 'guida_tv'})
+        self.elenco.add(kodiutils.LANGUAGE(32107), {'mode': 'cerca'})
+        self.elenco.end()
 
     def elenco_cerca_root(self):
-        kodiutils.addListItem(kodiutils.LANGUAGE(32115), {'mode': 'cerca', 'type': 'programmi'})
-        kodiutils.addListItem(kodiutils.LANGUAGE(32116), {'mode': 'cerca', 'type': 'clip'})
-        kodiutils.addListItem(kodiutils.LANGUAGE(32117), {'mode': 'cerca', 'type': 'episodi'})
-        kodiutils.addListItem(kodiutils.LANGUAGE(32103), {'mode': 'cerca', 'type': 'film'})
-        kodiutils.endScript()
+        self.elenco.add(kodiutils.LANGUAGE(32115), {'mode': 'cerca', 'type': 'programmi'})
+        self.elenco.add(kodiutils.LANGUAGE(32116), {'mode': 'cerca', 'type': 'clip'})
+        self.elenco.add(kodiutils.LANGUAGE(32117), {'mode': 'cerca', 'type': 'episodi'})
+        self.elenco.add(kodiutils.LANGUAGE(32103), {'mode': 'cerca', 'type': 'film'})
+        self.elenco.end()
 
     def apri_ricerca(self, sez):
         text = kodiutils.getKeyboardText(kodiutils.LANGUAGE(32131))
@@ -112,26 +219,28 @@ class KodiMediaset(object):
                             'episodi': True, 'film': False}
                 self.__analizza_elenco(els, True, titlewd=exttitle.get(sez, False))
                 if hasmore:
-                    kodiutils.addListItem(kodiutils.LANGUAGE(32130),
-                                          {'mode': 'cerca', 'search': text, 'type': sez,
-                                           'page': page + 1 if page else 2})
-        kodiutils.endScript()
+                    self.elenco.add(kodiutils.LANGUAGE(32130),
+                                    {'mode': 'cerca', 'search': text, 'type': sez,
+                                     'page': page + 1 if page else 2})
+                    self.__precarica(self.med.Cerca, text, sezcode, pageels=self.iperpage,
+                                     page=page + 1 if page else 2)
+        self.elenco.end()
 
     def elenco_tutto_root(self):
-        kodiutils.addListItem(kodiutils.LANGUAGE(32121), {'mode': 'tutto', 'all': 'true'})
-        kodiutils.addListItem(kodiutils.LANGUAGE(32122), {'mode': 'tutto', 'all': 'false'})
-        kodiutils.endScript()
+        self.elenco.add(kodiutils.LANGUAGE(32121), {'mode': 'tutto', 'all': 'true'})
+        self.elenco.add(kodiutils.LANGUAGE(32122), {'mode': 'tutto', 'all': 'false'})
+        self.elenco.end()
 
     def elenco_tutto_lettere(self, inonda):
         letters = ['a', 'b', 'c', 'd', 'e', 'f', 'g', 'h', 'i', 'j', 'k', 'l', 'm',
                    'n', 'o', 'p', 'q', 'r', 's', 't', 'u', 'v', 'w', 'x', 'y', 'z', '#']
-        kodiutils.addListItem(kodiutils.LANGUAGE(
+        self.elenco.add(kodiutils.LANGUAGE(
             32121), {'mode': 'tutto', 'all': 'false' if inonda else 'true', 'letter': 'all'})
         for letter in letters:
-            kodiutils.addListItem(letter.upper(),
-                                  {'mode': 'tutto', 'all': 'false' if inonda else 'true',
-                                   'letter': letter})
-        kodiutils.endScript()
+            self.elenco.add(letter.upper(),
+                            {'mode': 'tutto', 'all': 'false' if inonda else 'true',
+                             'letter': letter})
+        self.elenco.end()
 
     def elenco_tutto_lettera(self, inonda, lettera, page=None):
         kodiutils.setContent('videos')
@@ -140,10 +249,12 @@ class KodiMediaset(object):
         if els:
             self.__analizza_elenco(els)
             if hasmore:
-                kodiutils.addListItem(kodiutils.LANGUAGE(32130),
-                                      {'mode': 'tutto', 'all': 'false' if inonda else 'true',
-                                       'letter': lettera, 'page': page + 1 if page else 2})
-        kodiutils.endScript()
+                self.elenco.add(kodiutils.LANGUAGE(32130),
+                                {'mode': 'tutto', 'all': 'false' if inonda else 'true',
+                                 'letter': lettera, 'page': page + 1 if page else 2})
+                self.__precarica(self.med.OttieniTuttoLettera, lettera, inonda,
+                                 pageels=self.iperpage, page=page + 1 if page else 2)
+        self.elenco.end()
 
     def elenco_tutto_tutti(self, inonda, page=None):
         kodiutils.setContent('videos')
@@ -151,19 +262,21 @@ class KodiMediaset(object):
         if els:
             self.__analizza_elenco(els)
             if hasmore:
-                kodiutils.addListItem(kodiutils.LANGUAGE(32130),
-                                      {'mode': 'tutto', 'all': 'false' if inonda else 'true',
-                                       'letter': 'all', 'page': page + 1 if page else 2})
-        kodiutils.endScript()
+                self.elenco.add(kodiutils.LANGUAGE(32130),
+                                {'mode': 'tutto', 'all': 'false' if inonda else 'true',
+                                 'letter': 'all', 'page': page + 1 if page else 2})
+                self.__precarica(self.med.OttieniTutto, inonda, pageels=self.iperpage,
+                                 page=page + 1 if page else 2)
+        self.elenco.end()
 
     def elenco_programmi_root(self):
-        # kodiutils.addListItem(kodiutils.LANGUAGE(32121), {'mode': 'programmi', 'all': 'true'})
-        # kodiutils.addListItem(kodiutils.LANGUAGE(32122), {'mode': 'programmi', 'all': 'false'})
+        # self.elenco.add(kodiutils.LANGUAGE(32121), {'mode': 'programmi', 'all': 'true'})
+        # self.elenco.add(kodiutils.LANGUAGE(32122), {'mode': 'programmi', 'all': 'false'})
         for sec in self.med.OttieniCategorieProgrammi():
             if ("uxReference" not in sec):
                 continue
-            kodiutils.addListItem(sec["title"], {'mode': 'sezione', 'id': sec['uxReference']})
-        kodiutils.endScript()
+            self.elenco.add(sec["title"], {'mode': 'sezione', 'id': sec['uxReference']})
+        self.elenco.end()
 
     def elenco_programmi_tutti(self, inonda, page=None):
         kodiutils.setContent('tvshows')
@@ -172,19 +285,21 @@ class KodiMediaset(object):
         if els:
             self.__analizza_elenco(els)
             if hasmore:
-                kodiutils.addListItem(kodiutils.LANGUAGE(32130),
-                                      {'mode': 'programmi', 'all': 'false' if inonda else 'true',
-                                       'page': page + 1 if page else 2})
-        kodiutils.endScript()
+                self.elenco.add(kodiutils.LANGUAGE(32130),
+                                {'mode': 'programmi', 'all': 'false' if inonda else 'true',
+                                 'page': page + 1 if page else 2})
+                self.__precarica(self.med.OttieniTuttiProgrammi, inonda, pageels=self.iperpage,
+                                 page=page + 1 if page else 2)
+        self.elenco.end()
 
     def elenco_fiction_root(self):
-        # kodiutils.addListItem(kodiutils.LANGUAGE(32121), {'mode': 'fiction', 'all': 'true'})
-        # kodiutils.addListItem(kodiutils.LANGUAGE(32122), {'mode': 'fiction', 'all': 'false'})
+        # self.elenco.add(kodiutils.LANGUAGE(32121), {'mode': 'fiction', 'all': 'true'})
+        # self.elenco.add(kodiutils.LANGUAGE(32122), {'mode': 'fiction', 'all': 'false'})
         for sec in self.med.OttieniGeneriFiction():
             if ("uxReference" not in sec):
                 continue
-            kodiutils.addListItem(sec["title"], {'mode': 'sezione', 'id': sec['uxReference']})
-        kodiutils.endScript()
+            self.elenco.add(sec["title"], {'mode': 'sezione', 'id': sec['uxReference']})
+        self.elenco.end()
 
     def elenco_fiction_tutti(self, inonda, page=None):
         kodiutils.setContent('tvshows')
@@ -193,27 +308,29 @@ class KodiMediaset(object):
         if els:
             self.__analizza_elenco(els)
             if hasmore:
-                kodiutils.addListItem(kodiutils.LANGUAGE(32130),
-                                      {'mode': 'fiction', 'all': 'false' if inonda else 'true',
-                                       'page': page + 1 if page else 2})
-        kodiutils.endScript()
+                self.elenco.add(kodiutils.LANGUAGE(32130),
+                                {'mode': 'fiction', 'all': 'false' if inonda else 'true',
+                                 'page': page + 1 if page else 2})
+                self.__precarica(self.med.OttieniTutteFiction, inonda, pageels=self.iperpage,
+                                 page=page + 1 if page else 2)
+        self.elenco.end()
 
     def elenco_film_root(self):
         # not working as of 04/02/2023
-        # kodiutils.addListItem(kodiutils.LANGUAGE(32121), {'mode': 'film', 'all': 'true'})
+        # self.elenco.add(kodiutils.LANGUAGE(32121), {'mode': 'film', 'all': 'true'})
         for sec in self.med.OttieniGeneriFilm():
             if ("uxReference" not in sec):
                 continue
-            kodiutils.addListItem(sec["title"], {'mode': 'sezione', 'id': sec['uxReference']})
-        kodiutils.endScript()
+            self.elenco.add(sec["title"], {'mode': 'sezione', 'id': sec['uxReference']})
+        self.elenco.end()
 
     def elenco_film_root_v2(self):
         for b in self.med.OttieniBlocchiFilm():
             if 'id' in b:
-                kodiutils.addListItem(b['title'], {'mode': 'sezioneV2', 'id': b['id']})
+                self.elenco.add(b['title'], {'mode': 'sezioneV2', 'id': b['id']})
             else:
-                kodiutils.addListItem(b['title'], {'mode': 'sezioneV2', 'code': b['code']})
-        kodiutils.endScript()
+                self.elenco.add(b['title'], {'mode': 'sezioneV2', 'code': b['code']})
+        self.elenco.end()
 
     def elenco_film_tutti(self, inonda, page=None):
         kodiutils.setContent('movies')
@@ -221,18 +338,20 @@ class KodiMediaset(object):
         if els:
             self.__analizza_elenco(els)
             if hasmore:
-                kodiutils.addListItem(kodiutils.LANGUAGE(32130),
-                                      {'mode': 'film', 'all': 'false' if inonda else 'true',
-                                       'page': page + 1 if page else 2})
-        kodiutils.endScript()
+                self.elenco.add(kodiutils.LANGUAGE(32130),
+                                {'mode': 'film', 'all': 'false' if inonda else 'true',
+                                 'page': page + 1 if page else 2})
+                self.__precarica(self.med.OttieniFilm, inonda, pageels=self.iperpage,
+                                 page=page + 1 if page else 2)
+        self.elenco.end()
 
     def elenco_kids_root(self):
-        # kodiutils.addListItem(kodiutils.LANGUAGE(32121), {'mode': 'kids', 'all': 'true'})
+        # self.elenco.add(kodiutils.LANGUAGE(32121), {'mode': 'kids', 'all': 'true'})
         for sec in self.med.OttieniGeneriKids():
             if ("uxReference" not in sec):
                 continue
-            kodiutils.addListItem(sec["title"], {'mode': 'sezione', 'id': sec['uxReference']})
-        kodiutils.endScript()
+            self.elenco.add(sec["title"], {'mode': 'sezione', 'id': sec['uxReference']})
+        self.elenco.end()
 
     def elenco_kids_tutti(self, inonda, page=None):
         kodiutils.setContent('tvshows')
@@ -240,18 +359,20 @@ class KodiMediaset(object):
         if els:
             self.__analizza_elenco(els)
             if hasmore:
-                kodiutils.addListItem(kodiutils.LANGUAGE(32130),
-                                      {'mode': 'kids', 'all': 'false' if inonda else 'true',
-                                       'page': page + 1 if page else 2})
-        kodiutils.endScript()
+                self.elenco.add(kodiutils.LANGUAGE(32130),
+                                {'mode': 'kids', 'all': 'false' if inonda else 'true',
+                                 'page': page + 1 if page else 2})
+                self.__precarica(self.med.OttieniKids, inonda, pageels=self.iperpage,
+                                 page=page + 1 if page else 2)
+        self.elenco.end()
 
     def elenco_documentari_root(self):
-        # kodiutils.addListItem("Tutto", {'mode': 'documentari', 'all': 'true'})
+        # self.elenco.add("Tutto", {'mode': 'documentari', 'all': 'true'})
         for sec in self.med.OttieniGeneriDocumentari():
             if ("uxReference" not in sec):
                 continue
-            kodiutils.addListItem(sec["title"], {'mode': 'sezione', 'id': sec['uxReference']})
-        kodiutils.endScript()
+            self.elenco.add(sec["title"], {'mode': 'sezione', 'id': sec['uxReference']})
+        self.elenco.end()
 
     def elenco_documentari_tutti(self, inonda, page=None):
         kodiutils.setContent('movies')
@@ -260,10 +381,12 @@ class KodiMediaset(object):
         if els:
             self.__analizza_elenco(els)
             if hasmore:
-                kodiutils.addListItem(kodiutils.LANGUAGE(32130),
-                                      {'mode': 'documentari', 'all': 'false' if inonda else 'true',
-                                       'page': page + 1 if page else 2})
-        kodiutils.endScript()
+                self.elenco.add(kodiutils.LANGUAGE(32130),
+                                {'mode': 'documentari', 'all': 'false' if inonda else 'true',
+                                 'page': page + 1 if page else 2})
+                self.__precarica(self.med.OttieniDocumentari, inonda, pageels=self.iperpage,
+                                 page=page + 1 if page else 2)
+        self.elenco.end()
 
     def elenco_sezione(self, sid, page=None):
         els, hasmore = self.med.OttieniProgrammiGenere(
@@ -271,9 +394,11 @@ class KodiMediaset(object):
         if els:
             self.__analizza_elenco(els, True)
             if hasmore:
-                kodiutils.addListItem(kodiutils.LANGUAGE(
+                self.elenco.add(kodiutils.LANGUAGE(
                     32130), {'mode': 'sezione', 'id': sid, 'page': page + 1 if page else 2})
-        kodiutils.endScript()
+                self.__precarica(self.med.OttieniProgrammiGenere, sid, pageels=self.iperpage,
+                                 page=page + 1 if page else 2)
+        self.elenco.end()
 
     def elenco_sezioneV2_from_code(self, sid, page=1):
         if not page:
@@ -282,9 +407,10 @@ class KodiMediaset(object):
         if els:
             self.__analizza_elenco(els, True)
             if hasmore:
-                kodiutils.addListItem(kodiutils.LANGUAGE(
+                self.elenco.add(kodiutils.LANGUAGE(
                     32130), {'mode': 'sezioneV2', 'code': sid, 'page': page + 1 if page else 2})
-        kodiutils.endScript()
+                self.__precarica(self.med.OttieniFilmPerTipo, sid, page=page + 1)
+        self.elenco.end()
 
     def elenco_sezioneV2_from_id(self, sid, page=1):
         if not page:
@@ -293,41 +419,94 @@ class KodiMediaset(object):
         if els:
             self.__analizza_elenco(els, True)
             if hasmore:
-                kodiutils.addListItem(kodiutils.LANGUAGE(
+                self.elenco.add(kodiutils.LANGUAGE(
                     32130), {'mode': 'sezioneV2', 'id': sid, 'page': page + 1 if page else 2})
-        kodiutils.endScript()
+                self.__precarica(self.med.OttieniFilmPerId, sid, page=page + 1)
+        self.elenco.end()
 
     def elenco_stagioni_list(self, seriesId):
-        els = self.med.OttieniStagioni(seriesId, sort='startYear|desc')
+        # the season and the section opened the last time are asked together with the
+        # seasons, so a show opened again costs one round trip instead of three
+        brandId = self.drillstore.get('series:' + seriesId)
+        subBrandId = self.drillstore.get('brand:' + brandId) if brandId else None
+        els, sezioni, video = self.__scarica_livelli(
+            lambda: self.med.OttieniStagioni(seriesId, sort='startYear|desc'), brandId, subBrandId)
         if len(els) == 1:
-            self.elenco_sezioni_list(els[0]['mediasettvseason$brandId'])
+            target = els[0]['mediasettvseason$brandId']
+            if target != brandId:
+                self.drillstore.set('series:' + seriesId, target, self.DRILL_DOWN_TTL)
+            if target == brandId and sezioni is not None:
+                self.elenco_sezioni_list(target, sezioni, video)
+            else:
+                self.elenco_sezioni_list(target)
         else:
+            self.drillstore.delete('series:' + seriesId)
             self.__analizza_elenco(els)
-            kodiutils.endScript()
-
-    def elenco_sezioni_list(self, brandId):
-        els = self.med.OttieniSezioniProgramma(
-            brandId, sort='mediasetprogram$order')
+            if els and 'mediasettvseason$brandId' in els[0]:
+                self.__precarica(self.med.OttieniSezioniProgramma,
+                                 els[0]['mediasettvseason$brandId'], sort='mediasetprogram$order')
+            self.elenco.end()
+
+    def elenco_sezioni_list(self, brandId, els=None, video=None):
+        subBrandId = self.drillstore.get('brand:' + brandId)
+        if els is None:
+            els, _, video = self.__scarica_livelli(
+                lambda: self.med.OttieniSezioniProgramma(brandId, sort='mediasetprogram$order'),
+                None, subBrandId)
         if len(els) == 2:
-            self.elenco_video_list(els[1]['mediasetprogram$subBrandId'], 1)
+            target = els[1]['mediasetprogram$subBrandId']
+            if target != subBrandId:
+                self.drillstore.set('brand:' + brandId, target, self.DRILL_DOWN_TTL)
+            self.elenco_video_list(target, 1, video if target == subBrandId else None)
         else:
+            self.drillstore.delete('brand:' + brandId)
             els.pop(0)
             self.__analizza_elenco(els)
-        kodiutils.endScript()
-
-    def elenco_video_list(self, subBrandId, start):
+            if els and 'mediasetprogram$subBrandId' in els[0]:
+                self.__precarica(self.med.OttieniVideoSezione,
+                                 els[0]['mediasetprogram$subBrandId'], sort=self.__ordine_video(),
+                                 erange=self.__imposta_range(1))
+        self.elenco.end()
+
+    def elenco_video_list(self, subBrandId, start, els=None):
+        sort = self.__ordine_video()
+        if els is None:
+            els = self.med.OttieniVideoSezione(
+                subBrandId, sort=sort, erange=self.__imposta_range(start))
+        if self.__analizza_elenco(els, True) == self.iperpage:
+            self.elenco.add(kodiutils.LANGUAGE(32130),
+                            {'mode': 'programma', 'sub_brand_id': subBrandId,
+                             'start': start + self.iperpage})
+            self.__precarica(self.med.OttieniVideoSezione, subBrandId, sort=sort,
+                             erange=self.__imposta_range(start + self.iperpage))
+        self.elenco.end()
+
+    @staticmethod
+    def __ordine_video():
         if (kodiutils.getSettingAsBool('sortmediaset')):
-            sort = 'mediasetprogram$publishInfo_lastPublished|desc'
-        else:
-            sort = 'mediasetprogram$publishInfo_lastPublished'
-        els = self.med.OttieniVideoSezione(
-            subBrandId, sort=sort, erange=self.__imposta_range(start))
-        self.__analizza_elenco(els, True)
-        if len(els) == self.iperpage:
-            kodiutils.addListItem(kodiutils.LANGUAGE(32130),
-                                  {'mode': 'programma', 'sub_brand_id': subBrandId,
-                                   'start': start + self.iperpage})
-        kodiutils.endScript()
+            return 'mediasetprogram$publishInfo_lastPublished|desc'
+        return 'mediasetprogram$publishInfo_lastPublished'
+
+    def __scarica_livelli(self, first, brandId, subBrandId):
+        # downloads the listing with the sections of brandId and the first page of
+        # subBrandId at the same time, the guesses give None when not asked or failed
+        if not brandId and not subBrandId:
+            return first(), None, None
+        med = self.med  # created here, not by the threads
+        sort = self.__ordine_video()
+        erange = self.__imposta_range(1)
+        calls = [first]
+        if brandId:
+            calls.append(lambda: med.OttieniSezioniProgramma(brandId, sort='mediasetprogram$order'))
+        if subBrandId:
+            calls.append(lambda: med.OttieniVideoSezione(subBrandId, sort=sort, erange=erange))
+        results = map_parallel(lambda call: call(), calls, log=kodiutils.log)
+        els = results.pop(0)
+        if els is None:
+            els = first()
+        sezioni = results.pop(0) if brandId else None
+        video = results.pop(0) if subBrandId else None
+        return els, sezioni, video
 
     def guida_tv_root(self):
         kodiutils.setContent('videos')
@@ -337,26 +516,27 @@ class KodiMediaset(object):
             arts = _gather_art(prog)
             if 'tuningInstruction' in prog:
                 if prog['tuningInstruction'] and not prog.get('mediasetstation$eventBased', False):
-                    kodiutils.addListItem(prog["title"],
-                                          {'mode': 'guida_tv', 'id': prog['callSign'],
-                                           'week': staticutils.get_timestamp_midnight()},
-                                          videoInfo=infos, arts=arts)
-        kodiutils.endScript()
+                    self.elenco.add(prog["title"],
+                                    {'mode': 'guida_tv', 'id': prog['callSign'],
+                                     'week': staticutils.get_timestamp_midnight()},
+                                    videoInfo=infos, arts=arts)
+        self.elenco.end()
 
     def guida_tv_canale_settimana(self, cid, dt):
         dt = staticutils.get_date_from_timestamp(dt)
         for d in range(0, 16):
             currdate = dt - timedelta(days=d)
-            kodiutils.addListItem(kodiutils.getFormattedDate(currdate),
-                                  {'mode': 'guida_tv', 'id': cid,
-                                   'day': staticutils.get_timestamp_midnight(currdate)})
-        # kodiutils.addListItem(kodiutils.LANGUAGE(32136),
+            self.elenco.add(kodiutils.getFormattedDate(currdate),
+                            {'mode': 'guida_tv', 'id': cid,
+                             'day': staticutils.get_timestamp_midnight(currdate)})
+        # self.elenco.add(kodiutils.LANGUAGE(32136),
         #                       {'mode': 'guida_tv', 'id': cid,
         #                       'week': staticutils.get_timestamp_midnight(dt - timedelta(days=7))})
-        kodiutils.endScript()
+        self.elenco.end()
 
     def guida_tv_canale_giorno(self, cid, dt):
-        res = self.med.OttieniGuidaTV(cid, dt, dt + 86399999)  # 86399999 is one day minus 1 ms
+        res = self.med.OttieniGuidaTV(cid, dt, dt + 86399999,  # 86399999 is one day minus 1 ms
+                                      days=self.med.OttieniGiorniGuidaTV())
         if 'listings' in res:
             for el in res['listings']:
                 if (kodiutils.getSettingAsBool('fullguide') or
@@ -370,56 +550,64 @@ class KodiMediaset(object):
                         el['endTime']).strftime("%H:%M")
                     s = "{s}-{e} - {t}".format(s=s_time, e=e_time,
                                                t=el['mediasetlisting$epgTitle'])
-                    kodiutils.addListItem(s,
-                                          {'mode': 'video', 'guid': el['program']['guid']},
-                                          videoInfo=infos, arts=arts, isFolder=False)
-        kodiutils.endScript()
+                    self.elenco.add(s,
+                                    {'mode': 'video', 'guid': el['program']['guid']},
+                                    videoInfo=infos, arts=arts, isFolder=False)
+        self.elenco.end()
 
     def canali_live_root(self):
         kodiutils.setContent('videos')
         now = staticutils.get_timestamp()
-        els = self.med.OttieniProgrammiLive()  # (sort='title')
-        chans = {}
-        for chan in els:
-            if 'listings' in chan and chan['listings']:
-                for prog in chan['listings']:
-                    if prog['startTime'] <= now <= prog['endTime']:
-                        guid = chan['guid']
-                        chans[guid] = {'title': '{} - {}'.format(kodiutils.py2_encode(chan['title']),
-                                                                 kodiutils.py2_encode(
-                                                                     prog["mediasetlisting$epgTitle"])),
-                                       'infos': _gather_info(prog),
-                                       'arts': _gather_art(prog),
-                                       'restartAllowed': prog.get('mediasetlisting$restartAllowed', False)}
-        els = self.med.OttieniCanaliLive(sort='ShortTitle')
-        for prog in els:
-            if (prog['callSign'] in chans and 'tuningInstruction' in prog and
-                    prog['tuningInstruction'] and not prog.get('mediasetstation$eventBased', False)):
-                chn = chans[prog['callSign']]
-                if chn['arts'] == {}:
-                    chn['arts'] = _gather_art(prog)
-                if chn['restartAllowed']:
-                    if kodiutils.getSettingAsBool('splitlive'):
-                        kodiutils.addListItem(chn['title'], {'mode': 'live',
-                                                             'guid': prog['callSign']},
-                                              videoInfo=chn['infos'], arts=chn['arts'])
-                        continue
-                    vid = self.__ottieni_vid_restart(prog['callSign'])
-                    if vid:
-                        kodiutils.addListItem(chn['title'], {'mode': 'video', 'pid': vid},
-                                              videoInfo=chn['infos'], arts=chn['arts'],
-                                              isFolder=False)
-                        continue
-                data = {'mode': 'live'}
-                vdata = prog['tuningInstruction']['urn:theplatform:tv:location:any']
-                for v in vdata:
-                    if v['format'] == 'application/x-mpegURL':
-                        data['id'] = v['releasePids'][0]
-                    else:
-                        data['mid'] = v['releasePids'][0]
-                kodiutils.addListItem(chn['title'], data,
-                                      videoInfo=chn['infos'], arts=chn['arts'], isFolder=False)
-        kodiutils.endScript()
+        lives, stations = map_parallel(
+            lambda f: f(), [self.med.OttieniProgrammiLive,  # (sort='title')
+                            lambda: self.med.OttieniCanaliLive(sort='ShortTitle')],
+            log=kodiutils.log)
+        lives = {chan['guid']: chan for chan in lives or []
+                 if 'listings' in chan and chan['listings']}
+        chans = []
+        for prog in stations or []:
+            if (prog['callSign'] not in lives or 'tuningInstruction' not in prog or
+                    not prog['tuningInstruction'] or prog.get('mediasetstation$eventBased', False)):
+                continue
+            chan = lives[prog['callSign']]
+            for el in chan['listings']:
+                if el['startTime'] <= now <= el['endTime']:
+                    chn = {'title': '{} - {}'.format(kodiutils.py2_encode(chan['title']),
+                                                     kodiutils.py2_encode(
+                                                         el["mediasetlisting$epgTitle"])),
+                           'infos': _gather_info(el),
+                           'arts': _gather_art(el) or _gather_art(prog),
+                           'restartAllowed': el.get('mediasetlisting$restartAllowed', False)}
+                    chans.append((prog, chn))
+                    break
+        splitlive = kodiutils.getSettingAsBool('splitlive')
+        restarts = [prog['callSign'] for prog, chn in chans
+                    if chn['restartAllowed'] and not splitlive]
+        vids = dict(zip(restarts, map_parallel(self.__ottieni_vid_restart, restarts,
+                                               log=kodiutils.log)))
+        for prog, chn in chans:
+            if chn['restartAllowed']:
+                if splitlive:
+                    self.elenco.add(chn['title'], {'mode': 'live',
+                                             'guid': prog['callSign']},
+                                    videoInfo=chn['infos'], arts=chn['arts'])
+                    continue
+                vid = vids.get(prog['callSign'])
+                if vid:
+                    self.elenco.add(chn['title'], {'mode': 'video', 'pid': vid},
+                                    videoInfo=chn['infos'], arts=chn['arts'],
+                                    isFolder=False)
+                    continue
+            data = {'mode': 'live'}
+            vdata = prog['tuningInstruction']['urn:theplatform:tv:location:any']
+            for v in vdata:
+                if v['format'] == 'application/x-mpegURL':
+                    data['id'] = v['releasePids'][0]
+                else:
+                    data['mid'] = v['releasePids'][0]
+            self.elenco.add(chn['title'], data,
+                            videoInfo=chn['infos'], arts=chn['arts'], isFolder=False)
+        self.elenco.end()
 
     def __ottieni_vid_restart(self, guid):
         res = self.med.OttieniLiveStream(guid)
@@ -449,15 +637,15 @@ class KodiMediaset(object):
                     data['id'] = v['releasePids'][0]
                 else:
                     data['mid'] = v['releasePids'][0]
-            kodiutils.addListItem(kodiutils.LANGUAGE(32137) + title, data, videoInfo=infos,
-                                  arts=arts, isFolder=False)
+            self.elenco.add(kodiutils.LANGUAGE(32137) + title, data, videoInfo=infos,
+                            arts=arts, isFolder=False)
         if ('currentListing' in res[0] and
                 res[0]['currentListing']['mediasetlisting$restartAllowed']):
             url = res[0]['currentListing']['restartUrl']
             vid = url.rpartition('/')[-1]
-            kodiutils.addListItem(kodiutils.LANGUAGE(32138) + title, {'mode': 'video', 'pid': vid},
-                                  videoInfo=infos, arts=arts, isFolder=False)
-        kodiutils.endScript()
+            self.elenco.add(kodiutils.LANGUAGE(32138) + title, {'mode': 'video', 'pid': vid},
+                            videoInfo=infos, arts=arts, isFolder=False)
+        self.elenco.end()
 
     def riproduci_guid(self, guid):
         res = self.med.OttieniInfoDaGuid(guid)
@@ -470,25 +658,37 @@ class KodiMediaset(object):
     def riproduci_video(self, pid, live=False):
         from inputstreamhelper import Helper  # pylint: disable=import-error
         kodiutils.log("Trying to get the video from pid" + pid)
+        # the service marks the video kodi failed to play, for a protected one most
+        # likely because of the license: don't trust the stored login this time
+        retry = self.playstore.get('failed') == pid
         data = self.med.OttieniDatiVideo(pid, live)
+        video = [pid, live]
         if data['type'] == 'video/mp4':
-            kodiutils.setResolvedUrl(data['url'])
+            self.__risolvi(video, data['url'])
             return
-        is_helper = Helper('mpd', 'com.widevine.alpha' if data['security'] else None)
+        manifest = self.MANIFEST_TYPES.get(data['type'], 'mpd')
+        is_helper = Helper(manifest, 'com.widevine.alpha' if data['security'] else None)
         if not is_helper.check_inputstream():
+            if self.__riproduci_mp4(data, video):
+                return
             kodiutils.showOkDialog(kodiutils.LANGUAGE(32132), kodiutils.LANGUAGE(32133))
             kodiutils.setResolvedUrl(solved=False)
             return
         headers = '&User-Agent={useragent}'.format(
             useragent=self.ua)
-        props = {'manifest_type': 'mpd', 'stream_headers': headers}
+        props = {'manifest_type': manifest, 'stream_headers': headers}
         if data['security']:
             user = kodiutils.getSetting('email')
             password = kodiutils.getSetting('password')
             if user == '' or password == '':
+                if self.__riproduci_mp4(data, video):
+                    return
                 kodiutils.showOkDialog(kodiutils.LANGUAGE(32132), kodiutils.LANGUAGE(32134))
                 kodiutils.setResolvedUrl(solved=False)
                 return
+            if retry:
+                self.playstore.delete('failed')
+                self.med.logout()
             if not self.med.login(user, password):
                 kodiutils.showOkDialog(kodiutils.LANGUAGE(32132), kodiutils.LANGUAGE(32135))
                 kodiutils.setResolvedUrl(solved=False)
@@ -499,14 +699,139 @@ class KodiMediaset(object):
             url = self.med.OttieniWidevineAuthUrl(data['pid'])
             props['license_key'] = '{url}|{headers}|R{{SSM}}|'.format(url=url, headers=headers)
 
-        headers = {'user-agent': self.ua,
-                   't-apigw': self.med.apigw, 't-cts': self.med.cts}
-        kodiutils.setResolvedUrl(data['url'], headers=headers, ins=is_helper.inputstream_addon,
-                                 insdata=props)
+        headers = {'user-agent': self.ua}
+        if self.med.apigw:
+            headers['t-apigw'] = self.med.apigw
+            headers['t-cts'] = self.med.cts
+        self.__risolvi(video, data['url'], headers=headers, ins=is_helper.inputstream_addon,
+                       insdata=props)
+
+    def __risolvi(self, video, url, **kwargs):
+        # read by the service, that forgets the stream if kodi fails to play this url
+        self.playstore.set('video', video + [url], self.PLAY_ERROR_TTL)
+        kodiutils.setResolvedUrl(url, **kwargs)
+
+    def __riproduci_mp4(self, data, video):
+        # the stream picked needs inputstream or a login that are missing: play a
+        # clear mp4 of the same SMIL if there was one, kodi plays it by itself
+        from resources.lib.smil import Candidate, SmilPolicy, pick
+        policy = SmilPolicy(types=('video/mp4',), max_height=self.med.videoMaxHeight)
+        cand = pick([Candidate(**c) for c in data.get('candidates', ()) if not c['security']],
+                    policy)
+        if cand is None:
+            return False
+        kodiutils.log('Playing the mp4 stream ' + cand.url, 4)
+        self.__risolvi(video, cand.url)
+        return True
+
+    def diagnostica(self):
+        # hidden view, opened with mode=diagnostics
+        def ms(latency):
+            return '-' if latency is None else '{:.0f}'.format(latency * 1000)
+        for family, requests, hitrate, p50, p90, p99, size in self.__tracestore().stats():
+            self.elenco.add(kodiutils.LANGUAGE(32139).format(
+                family, requests, hitrate, ms(p50), ms(p90), ms(p99), int(size / 1024)),
+                {'mode': 'diagnostics'})
+        self.elenco.end()
+
+    def __precarica(self, func, *args, **kwargs):
+        # the next page of the listing or the first item the user will likely open,
+        # downloaded into the cache once the listing is shown
+        self.__successiva = (func, args, kwargs)
+
+    def __scarica_successiva(self):
+        func, args, kwargs = self.__successiva
+        self.__successiva = None
+        if (not kodiutils.getSettingAsBool('prefetch') or
+                int(kodiutils.getSetting('cachesize') or 0) <= 0):
+            return
+        import xbmc  # pylint: disable=import-error
+        free = ''.join(c for c in xbmc.getInfoLabel('System.Memory(free)') if c.isdigit())
+        if free and int(free) < self.PREFETCH_MIN_MEMORY:
+            return
+        monitor = xbmc.Monitor()
+        if monitor.abortRequested():
+            return
+        self.med.serveStale = False
+
+        def scarica():
+            try:
+                func(*args, **kwargs)
+            except Exception as e:  # pylint: disable=broad-except
+                kodiutils.log('Prefetch failed: {}'.format(e), 4)
+
+        # the download runs in a daemon thread, so when kodi is closing the
+        # script stops waiting and can end without the answer
+        import threading
+        worker = threading.Thread(target=scarica)
+        worker.daemon = True
+        worker.start()
+        deadline = time.time() + self.PREFETCH_TIMEOUT
+        worker.join(self.PREFETCH_POLL)
+        while worker.is_alive():
+            if monitor.abortRequested() or time.time() > deadline:
+                kodiutils.log('Prefetch cancelled', 4)
+                return
+            worker.join(self.PREFETCH_POLL)
+
+    def __aggiorna_elenco(self):
+        # the listing was built from expired data: download it again and refresh the
+        # container if it changed and the user is still looking at it
+        if not self.med.refreshStale():
+            return
+        import xbmc  # pylint: disable=import-error
+        if xbmc.getInfoLabel('Container.FolderPath') == sys.argv[0] + sys.argv[2]:
+            xbmc.executebuiltin('Container.Refresh')
 
     def main(self):
         # parameter values
         params = staticutils.getParams()
+        try:
+            if kodiutils.getSettingAsBool('profiling'):
+                self.__profila(params)
+            else:
+                self.__esegui(params)
+        finally:
+            self.elenco.restore()
+            trace = self.__med.trace if self.__med is not None else None
+            if trace is not None:
+                self.__med.close()
+                kodiutils.log('Requests of {}: {}'.format(params or 'root', trace.summary()))
+                self.__tracestore().add(trace.records)
+
+    def __profila(self, params):
+        # saves the cpu profile of the invocation and logs the slowest calls
+        import cProfile
+        import io
+        import pstats
+        import re
+        profiler = cProfile.Profile()
+        try:
+            profiler.runcall(self.__esegui, params)
+        finally:
+            folder = os.path.join(self.profile, 'profiles')
+            tag = '-'.join('{}={}'.format(k, v) for k, v in sorted(
+                params.items(), key=lambda p: (p[0] != 'mode', p[0]))) or 'root'
+            path = os.path.join(folder, '{}-{}.pstats'.format(
+                int(time.time() * 1000), re.sub(r'[^\w=.-]+', '_', tag)[:80]))
+            try:
+                if not os.path.isdir(folder):
+                    os.makedirs(folder)
+                profiler.dump_stats(path)
+                old = sorted(f for f in os.listdir(folder) if f.endswith('.pstats'))
+                for name in old[:-self.MAX_PROFILES]:
+                    os.remove(os.path.join(folder, name))
+            except (IOError, OSError) as e:
+                kodiutils.log('Cannot save the profile: {}'.format(e), 4)
+            out = io.StringIO()
+            pstats.Stats(profiler, stream=out).sort_stats('cumulative').print_stats(
+                self.PROFILE_TOP)
+            kodiutils.log('Profile of {} saved to {}\n{}'.format(tag, path, out.getvalue()), 4)
+
+    def __esegui(self, params):
+        # applied when the client is created, the menus of these modes make no request
+        self.__staleview = (params.get('mode') in self.STALE_MODES and
+                            kodiutils.getSettingAsBool('staleview'))
         if 'mode' in params:
             page = None
             if 'page' in params:
@@ -560,7 +885,7 @@ class KodiMediaset(object):
                 else:
                     self.elenco_cerca_root()
             if params['mode'] == "sezione":
-                self.elenco_sezione(params['id'])
+                self.elenco_sezione(params['id'], page)
             if params['mode'] == "sezioneV2":
                 if 'id' in params:
                     self.elenco_sezioneV2_from_id(params['id'], page)
@@ -588,6 +913,8 @@ class KodiMediaset(object):
                     self.canali_live_play(params['guid'])
             if params['mode'] == "canali_live":
                 self.canali_live_root()
+            if params['mode'] == "diagnostics":
+                self.diagnostica()
             if params['mode'] == "guida_tv":
                 if 'id' in params:
                     if 'week' in params:
@@ -597,3 +924,7 @@ class KodiMediaset(object):
                 self.guida_tv_root()
         else:
             self.root()
+        if self.__med is not None and self.__med.serveStale:
+            self.__aggiorna_elenco()
+        if self.__successiva is not None:
+            self.__scarica_successiva()
@@ -1,3 +1,26 @@
+# feed fields read by the functions below and by the listings in main, used to ask
+# the theplatform feeds only for what is shown. Keep them updated with the code.
+MEDIA_TYPE_FIELDS = ('programType', 'mediasetprogram$brandVerticalSiteCMS', 'tvSeasonNumber',
+                     'tvSeasonEpisodeNumber', 'seriesId', 'mediasetprogram$subBrandId',
+                     'mediasetprogram$subBrandDescription')
+INFO_FIELDS = MEDIA_TYPE_FIELDS + (
+    'title', 'mediasetprogram$brandTitle', 'credits', 'shortDescription',
+    'mediasettvseason$shortDescription', 'description', 'mediasetprogram$brandDescription',
+    'mediasetprogram$genres', 'mediasettvseason$genres', 'tags', 'mediasetprogram$duration',
+    'year')
+ART_FIELDS = ('thumbnails',)
+LIST_FIELDS = INFO_FIELDS + ART_FIELDS + (
+    'media', 'tuningInstruction', 'mediasetstation$eventBased', 'mediasettvseason$brandId',
+    'mediasettvseason$displaySeason', 'mediasetprogram$brandId')
+FEED_FIELDS = {
+    'programs': LIST_FIELDS,
+    'brands': LIST_FIELDS,
+    'seasons': LIST_FIELDS,
+    'stations': LIST_FIELDS + ('callSign',),
+    'guid': ('media',),
+}
+
+
 
 def _gather_media_type(prog):
     if 'programType' in prog:
@@ -135,3 +158,31 @@ def _gather_art(prog):
     elif 'program' in prog:
         return _gather_art(prog['program'])
     return arts
+
+
+class ProgramItem(object):
+    """Feed element with its infos and artworks.
+
+    The infos and the artworks are gathered the first time they are used,
+    so the elements skipped by the listings don't pay for them.
+    """
+
+    __slots__ = ('prog', 'titlewd', '_infos', '_arts')
+
+    def __init__(self, prog, titlewd=False):
+        self.prog = prog
+        self.titlewd = titlewd
+        self._infos = None
+        self._arts = None
+
+    @property
+    def infos(self):
+        if self._infos is None:
+            self._infos = _gather_info(self.prog, titlewd=self.titlewd)
+        return self._infos
+
+    @property
+    def arts(self):
+        if self._arts is None:
+            self._arts = _gather_art(self.prog)
+        return self._arts
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+import os
+import xbmc  # pylint: disable=import-error
+import xbmcaddon  # pylint: disable=import-error
+import xbmcvfs  # pylint: disable=import-error
+from resources.lib.keystore import KeyStore
+from resources.lib.mediaset import Mediaset
+
+
+class Riproduttore(xbmc.Player):
+    """Player telling the service when kodi starts or fails to play something.
+
+    The callbacks get the file kodi was playing, ``None`` when it's not known,
+    the events come for the videos of every addon.
+    """
+
+    def __init__(self, onstart, onerror):
+        xbmc.Player.__init__(self)
+        self.onstart = onstart
+        self.onerror = onerror
+        self.file = None
+
+    def onPlayBackStarted(self):
+        # the file isn't available anymore when the playback fails
+        try:
+            self.file = self.getPlayingFile()
+        except RuntimeError:
+            self.file = None
+
+    def onAVStarted(self):
+        self.onstart(self.file)
+
+    def onPlayBackError(self):
+        file, self.file = self.file, None
+        self.onerror(file)
+
+    def onPlayBackStopped(self):
+        self.file = None
+
+    onPlayBackEnded = onPlayBackStopped
+
+
+class EpgService(object):
+    """Keeps the local tv guide of every channel up to date in background.
+
+    The guide is downloaded only while kodi is idle and nothing is playing,
+    one request for each channel covering all the days missing from the local
+    store, so after the first run only the current day and the new ones are
+    downloaded. It also forgets the saved stream of a video kodi fails to play
+    and marks it as failed, so the plugin logs in again before the next try.
+    """
+
+    INTERVAL = 30 * 60
+    IDLE_TIME = 120
+    DAYS = 16
+    # seconds a failed video makes the plugin log in again when it's played
+    FAILED_TTL = 30 * 60
+
+    def __init__(self):
+        self.addon = xbmcaddon.Addon()
+        self.monitor = xbmc.Monitor()
+        self.player = Riproduttore(self.__avvio_riproduzione, self.__errore_riproduzione)
+
+    def log(self, msg, level=1):
+        xbmc.log('[{}] {}'.format(self.addon.getAddonInfo('id'), msg),
+                 xbmc.LOGDEBUG if level > 1 else xbmc.LOGINFO)
+
+    def __libero(self):
+        return (not self.monitor.abortRequested() and not self.player.isPlaying() and
+                xbmc.getGlobalIdleTime() >= self.IDLE_TIME)
+
+    def __percorso(self):
+        path = xbmcvfs.translatePath(self.addon.getAddonInfo('profile'))
+        if not os.path.isdir(path):
+            os.makedirs(path)
+        return path
+
+    def __mediaset(self):
+        med = Mediaset(self.__percorso(),
+                       int(self.addon.getSetting('cachesize') or 0) * 1024 * 1024)
+        med.log = self.log
+        return med
+
+    def __playstore(self):
+        return KeyStore(os.path.join(self.__percorso(), 'playback.json'))
+
+    @staticmethod
+    def __nostro(video, file):
+        # the video resolved by the plugin is the one kodi played, kodi keeps the
+        # headers after a | in the url
+        return bool(video and file) and len(video) > 2 and file.split('|')[0] == video[2]
+
+    def __avvio_riproduzione(self, file):
+        # the last try played, the login is fine again
+        playstore = self.__playstore()
+        if self.__nostro(playstore.get('video'), file):
+            playstore.delete('failed')
+
+    def __errore_riproduzione(self, file):
+        # the saved stream of the last video resolved by the plugin may be expired
+        playstore = self.__playstore()
+        video = playstore.get('video')
+        if not self.__nostro(video, file):
+            return
+        playstore.delete('video')
+        playstore.set('failed', video[0], self.FAILED_TTL)
+        self.log('Playback failed, forgetting the stream of {}'.format(video[0]))
+        med = self.__mediaset()
+        try:
+            med.DimenticaDatiVideo(video[0], video[1])
+        finally:
+            med.close()
+
+    def aggiorna(self):
+        med = self.__mediaset()
+        try:
+            self.__aggiorna(med)
+        finally:
+            med.close()
+
+    def __aggiorna(self, med):
+        els = med.OttieniCanaliLive(sort='ShortTitle')
+        if not els:
+            return
+        days = med.OttieniGiorniGuidaTV(self.DAYS)
+        self.log('Updating tv guide of {} channels'.format(len(els)))
+        for prog in els:
+            if not prog.get('tuningInstruction') or prog.get('mediasetstation$eventBased', False):
+                continue
+            if not self.__libero():
+                return
+            # a covered guide is answered by the local store without requests
+            med.OttieniGuidaTV(prog['callSign'], days[-1][0], days[0][1], days=days)
+
+    def run(self):
+        while not self.monitor.abortRequested():
+            if self.addon.getSettingBool('epgservice') and self.__libero():
+                try:
+                    self.aggiorna()
+                except Exception as e:  # pylint: disable=broad-except
+                    self.log('Tv guide update failed: {}'.format(e))
+            if self.monitor.waitForAbort(self.INTERVAL):
+                break
@@ -0,0 +1,4 @@
+# -*- coding: utf-8 -*-
+from resources.service import EpgService
+
+EpgService().run()
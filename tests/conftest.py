@@ -0,0 +1,8 @@
+import os
+import sys
+
+# the addon and the stand-ins of the kodi modules it imports
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for path in (os.path.join(ROOT, 'tests', 'stubs'), ROOT):
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,12 @@
+"""Stand-in for script.module.inputstreamhelper."""
+
+
+class Helper(object):
+    inputstream_addon = 'inputstream.adaptive'
+
+    def __init__(self, protocol, drm=None):
+        self.protocol = protocol
+        self.drm = drm
+
+    def check_inputstream(self):
+        return True
@@ -0,0 +1,4 @@
+"""Stand-in for script.module.phate89 with the functions the addon uses.
+
+Only meant for the tests and the benchmarks, which run outside kodi.
+"""
@@ -0,0 +1,112 @@
+import os
+import re
+import sys
+import xbmc  # pylint: disable=import-error
+import xbmcgui  # pylint: disable=import-error
+import xbmcplugin  # pylint: disable=import-error
+from phate89lib import staticutils
+
+_RESOURCES = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', '..',
+                          'resources')
+
+
+def _defaults():
+    # a regex and not ElementTree, so the import time test only sees what the addon loads
+    with open(os.path.join(_RESOURCES, 'settings.xml'), encoding='utf-8') as f:
+        text = f.read()
+    settings = {}
+    for attrs in re.findall(r'<setting\s([^>]*)/?>', text):
+        attrs = dict(re.findall(r'(\w+)="([^"]*)"', attrs))
+        if attrs.get('id'):
+            settings[attrs['id']] = attrs.get('default', '')
+    return settings
+
+
+def _strings():
+    path = os.path.join(_RESOURCES, 'language', 'resource.language.en_gb', 'strings.po')
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+    return {int(i): s for i, s in re.findall(r'msgctxt "#(\d+)"\nmsgid ".*"\nmsgstr "(.*)"', text)}
+
+
+# settings of the addon, the defaults of settings.xml that tests can change
+SETTINGS = _defaults()
+STRINGS = _strings()
+# text typed in the keyboard dialog
+KEYBOARD = ''
+LOGS = []
+
+
+def LANGUAGE(string_id):
+    return STRINGS.get(string_id, str(string_id))
+
+
+def getSetting(key):
+    return SETTINGS.get(key, '')
+
+
+def getSettingAsBool(key):
+    return getSetting(key).lower() == 'true'
+
+
+def log(msg, level=2):
+    LOGS.append((level, msg))
+    xbmc.log(msg, xbmc.LOGDEBUG if level > 1 else xbmc.LOGINFO)
+
+
+def py2_encode(s):
+    return s
+
+
+def getFormattedDate(dt):
+    return dt.strftime('%A %d %B %Y')
+
+
+def getKeyboardText(heading, default=''):
+    return KEYBOARD
+
+
+def showOkDialog(heading, line):
+    return xbmcgui.Dialog().ok(heading, line)
+
+
+def setContent(content):
+    xbmcplugin.setContent(int(sys.argv[1]), content)
+
+
+def addListItem(label="", params=None, label2=None, thumb=None, fanart=None, poster=None,
+                arts=None, videoInfo=None, properties=None, isFolder=True):
+    url = staticutils.parameters(params) if isinstance(params, dict) else params
+    item = xbmcgui.ListItem(label, label2 or '')
+    arts = dict(arts or {})
+    if thumb:
+        arts['thumb'] = thumb
+    if fanart:
+        arts['fanart'] = fanart
+    if poster:
+        arts['poster'] = poster
+    item.setArt(arts)
+    if videoInfo:
+        item.setInfo('video', videoInfo)
+    for key, value in (properties or {}).items():
+        item.setProperty(key, value)
+    if not isFolder:
+        item.setProperty('IsPlayable', 'true')
+    return xbmcplugin.addDirectoryItem(int(sys.argv[1]), url, item, isFolder)
+
+
+def endScript(message=None, loglevel=2, closedir=True):
+    if message:
+        log(message, loglevel)
+    if closedir:
+        xbmcplugin.endOfDirectory(int(sys.argv[1]))
+
+
+def setResolvedUrl(url='', solved=True, headers=None, subs=None, ins=None, insdata=None,
+                   exit=True):
+    item = xbmcgui.ListItem(path=url)
+    if ins:
+        item.setProperty('inputstream', ins)
+        for key, value in (insdata or {}).items():
+            item.setProperty('{}.{}'.format(ins, key), value)
+    xbmcplugin.setResolvedUrl(int(sys.argv[1]), solved, item)
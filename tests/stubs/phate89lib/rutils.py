@@ -0,0 +1,32 @@
+import requests
+
+
+class RUtils(object):
+    """Requests helper the Mediaset client is built on.
+
+    Like the real one the session is shared by every instance.
+    """
+
+    USERAGENT = ''
+    SESSION = requests.Session()
+
+    def __init__(self):
+        if self.USERAGENT:
+            self.SESSION.headers['User-Agent'] = self.USERAGENT
+
+    def log(self, msg, level=2):
+        pass
+
+    def setHeader(self, key, value):
+        self.SESSION.headers[key] = value
+
+    def createRequest(self, url, post=None, headers=None):
+        if post is not None:
+            return self.SESSION.post(url, data=post, headers=headers)
+        return self.SESSION.get(url, headers=headers)
+
+    def getJson(self, url):
+        return self.createRequest(url).json()
+
+    def getText(self, url):
+        return self.createRequest(url).text
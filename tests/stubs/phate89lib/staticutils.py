@@ -0,0 +1,34 @@
+import sys
+import time
+from datetime import datetime
+try:
+    from urllib.parse import urlencode, parse_qsl
+except ImportError:
+    from urllib import urlencode
+    from urlparse import parse_qsl
+
+
+def parameters(p, host=None):
+    return (host or sys.argv[0]) + '?' + urlencode(p)
+
+
+def getParams():
+    if len(sys.argv) < 3 or not sys.argv[2]:
+        return {}
+    return dict(parse_qsl(sys.argv[2].lstrip('?')))
+
+
+def get_timestamp(dt=None):
+    if dt is None:
+        return int(time.time() * 1000)
+    return int(time.mktime(dt.timetuple()) * 1000)
+
+
+def get_date_from_timestamp(ts):
+    return datetime.fromtimestamp(ts / 1000)
+
+
+def get_timestamp_midnight(dt=None):
+    if dt is None:
+        dt = datetime.now()
+    return get_timestamp(datetime(dt.year, dt.month, dt.day))
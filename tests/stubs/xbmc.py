@@ -0,0 +1,56 @@
+"""Stand-in for the kodi ``xbmc`` module, enough for the addon and the tests."""
+import time
+
+LOGDEBUG = 0
+LOGINFO = 1
+LOGWARNING = 2
+LOGERROR = 3
+
+# info labels answered by getInfoLabel, tests can change them
+LABELS = {'System.Memory(free)': '2048MB'}
+LOGS = []
+BUILTINS = []
+
+
+def log(msg, level=LOGDEBUG):
+    LOGS.append((level, msg))
+
+
+def getInfoLabel(label):
+    return LABELS.get(label, '')
+
+
+def executebuiltin(function, wait=False):
+    BUILTINS.append(function)
+
+
+def getGlobalIdleTime():
+    return 0
+
+
+class Monitor(object):
+    aborted = False
+
+    def abortRequested(self):
+        return Monitor.aborted
+
+    def waitForAbort(self, timeout=0):
+        if not Monitor.aborted and timeout:
+            time.sleep(timeout)
+        return Monitor.aborted
+
+
+class Player(object):
+    # file being played, tests can change it
+    FILE = ''
+
+    def __init__(self):
+        pass
+
+    def isPlaying(self):
+        return bool(Player.FILE)
+
+    def getPlayingFile(self):
+        if not Player.FILE:
+            raise RuntimeError('Kodi is not playing any media file')
+        return Player.FILE
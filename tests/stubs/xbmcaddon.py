@@ -0,0 +1,28 @@
+"""Stand-in for the kodi ``xbmcaddon`` module.
+
+The profile folder is ``PROFILE``, a temporary folder unless a test sets it.
+"""
+import tempfile
+
+PROFILE = tempfile.mkdtemp(prefix='videomediaset-')
+
+
+class Addon(object):
+
+    def __init__(self, id=None):
+        pass
+
+    def getAddonInfo(self, key):
+        if key == 'profile':
+            return PROFILE
+        if key == 'id':
+            return 'plugin.video.videomediaset'
+        return ''
+
+    def getSetting(self, key):
+        from phate89lib import kodiutils
+        return kodiutils.getSetting(key)
+
+    def getSettingBool(self, key):
+        from phate89lib import kodiutils
+        return kodiutils.getSettingAsBool(key)
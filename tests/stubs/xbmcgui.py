@@ -0,0 +1,39 @@
+"""Stand-in for the kodi ``xbmcgui`` module."""
+
+
+class ListItem(object):
+
+    def __init__(self, label='', label2='', path='', offscreen=False):
+        self.label = label
+        self.label2 = label2
+        self.path = path
+        self.art = {}
+        self.info = {}
+        self.properties = {}
+
+    def getLabel(self):
+        return self.label
+
+    def setArt(self, values):
+        self.art.update(values)
+
+    def setInfo(self, type, infoLabels):
+        self.info[type] = infoLabels
+
+    def setProperty(self, key, value):
+        self.properties[key] = value
+
+    def setPath(self, path):
+        self.path = path
+
+    def setMimeType(self, mimetype):
+        self.properties['mimetype'] = mimetype
+
+    def setContentLookup(self, enable):
+        self.properties['contentlookup'] = enable
+
+
+class Dialog(object):
+
+    def ok(self, heading, message):
+        return True
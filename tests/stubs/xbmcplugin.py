@@ -0,0 +1,54 @@
+"""Stand-in for the kodi ``xbmcplugin`` module.
+
+Every call is recorded in ``CALLS`` as ``(function, number of items)`` and
+the items added are kept in ``ITEMS``, so the tests and the benchmarks can
+see what a listing handed to kodi. ``reset`` clears them. ``COST`` is the
+time in seconds spent by every call, for the benchmarks of the calls into
+kodi.
+"""
+import time
+
+COST = 0
+CALLS = []
+ITEMS = []
+RESOLVED = []
+
+
+def reset():
+    del CALLS[:]
+    del ITEMS[:]
+    del RESOLVED[:]
+
+
+def _call():
+    if COST:
+        end = time.perf_counter() + COST
+        while time.perf_counter() < end:
+            pass
+
+
+def addDirectoryItem(handle, url, listitem, isFolder=False, totalItems=0):
+    _call()
+    CALLS.append(('addDirectoryItem', 1))
+    ITEMS.append((url, listitem, isFolder))
+    return True
+
+
+def addDirectoryItems(handle, items, totalItems=0):
+    _call()
+    CALLS.append(('addDirectoryItems', len(items)))
+    ITEMS.extend(items)
+    return True
+
+
+def endOfDirectory(handle, succeeded=True, updateListing=False, cacheToDisc=True):
+    CALLS.append(('endOfDirectory', 0))
+
+
+def setResolvedUrl(handle, succeeded, listitem):
+    CALLS.append(('setResolvedUrl', 1))
+    RESOLVED.append((succeeded, listitem))
+
+
+def setContent(handle, content):
+    CALLS.append(('setContent', 0))
@@ -0,0 +1,5 @@
+"""Stand-in for the kodi ``xbmcvfs`` module."""
+
+
+def translatePath(path):
+    return path
@@ -0,0 +1,28 @@
+import time
+
+from phate89lib import rutils
+from benchmarks import run
+from benchmarks.stubserver import StubServer
+
+
+def test_every_mode_runs_against_the_stub():
+    results = run.run(items=5, repeat=1)
+    assert [r.mode for r in results] == [name for name, _ in run.modes()]
+    for r in results:
+        if r.mode == 'diagnostics':
+            continue
+        assert r.items or r.resolved, r.mode
+    byname = {r.mode: r for r in results}
+    assert byname['root'].requests == 0
+    assert byname['programma series'].requests == 3
+    assert byname['video pid'].resolved
+
+
+def test_stub_server_latency():
+    with StubServer(latency=0.05) as server:
+        server.install(rutils.RUtils.SESSION)
+        start = time.time()
+        res = rutils.RUtils.SESSION.get('https://api.one.accedo.tv/session')
+        assert time.time() - start >= 0.05
+    assert res.json() == {'sessionKey': 'session'}
+    assert server.log == [('GET', 'api.one.accedo.tv/session', 200, len(res.content))]
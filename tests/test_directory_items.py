@@ -0,0 +1,55 @@
+import sys
+
+import xbmcplugin  # pylint: disable=import-error
+
+from benchmarks import listing
+from resources.main import DirectoryItems
+
+
+def _snapshot():
+    return [(url, item.label, item.art, item.info, item.properties, folder)
+            for url, item, folder in xbmcplugin.ITEMS]
+
+
+def test_listing_is_one_call_into_kodi():
+    _, calls = listing.measure(listing.batched, 500)
+    assert calls == 2
+    assert [c[0] for c in xbmcplugin.CALLS] == ['addDirectoryItems', 'endOfDirectory']
+    assert xbmcplugin.CALLS[0][1] == 500
+
+
+def test_items_are_the_ones_of_addlistitem():
+    listing.measure(listing.per_item, 20)
+    single = _snapshot()
+    listing.measure(listing.batched, 20)
+    assert _snapshot() == single
+    # kodiutils is left calling kodi again
+    assert xbmcplugin.addDirectoryItem.__module__ == 'xbmcplugin'
+
+
+def test_batched_is_faster_with_costly_calls():
+    single, _ = listing.measure(listing.per_item, 300, cost=50e-6)
+    batch, _ = listing.measure(listing.batched, 300, cost=50e-6)
+    assert batch < single
+
+
+def test_collector_is_installed_once_for_the_listing(monkeypatch):
+    monkeypatch.setattr(sys, 'argv', ['plugin://plugin.video.videomediaset/', '1', ''])
+    kodi = xbmcplugin.addDirectoryItem
+    items = DirectoryItems()
+    items.add('first', {'mode': 'a'})
+    collector = xbmcplugin.addDirectoryItem
+    assert collector is not kodi
+    items.add('second', {'mode': 'b'})
+    assert xbmcplugin.addDirectoryItem is collector
+    items.end()
+    assert xbmcplugin.addDirectoryItem is kodi
+    assert len(items.items) == 0
+
+
+def test_restore_after_a_listing_left_unfinished():
+    kodi = xbmcplugin.addDirectoryItem
+    items = DirectoryItems()
+    items.add('only', {'mode': 'a'})
+    items.restore()
+    assert xbmcplugin.addDirectoryItem is kodi
@@ -0,0 +1,106 @@
+import ast
+import inspect
+import textwrap
+
+from benchmarks import fixtures
+from resources import main
+from resources import mediaset_datahelper as datahelper
+from resources.mediaset_datahelper import FEED_FIELDS
+
+# keys read by the extractors that the projected feeds never have: they belong
+# to answers asked without ``fields``
+UNPROJECTED = {
+    'program',  # listings of the tv guide and of the live channels
+    'id_brand',  # azlisting answers
+}
+
+
+def _source(func):
+    return ast.parse(textwrap.dedent(inspect.getsource(func)))
+
+
+def _key(node):
+    value = node.slice
+    if type(value).__name__ == 'Index':  # python < 3.9
+        value = value.value
+    if isinstance(value, ast.Constant) and isinstance(value.value, str):
+        return value.value
+    return None
+
+
+def _element(node, names):
+    # a variable holding a feed element, or an element taken from a list of them
+    if isinstance(node, ast.Name):
+        return node.id in names
+    return (isinstance(node, ast.Subscript) and isinstance(node.value, ast.Name) and
+            node.value.id in names and _key(node) is None)
+
+
+def read_keys(func, names=('prog',)):
+    """Keys ``func`` reads from the elements in the variables ``names``.
+
+    Counts ``el['key']``, ``el.get('key')`` and ``'key' in el``, where ``el`` is
+    one of the variables or an element of a list in one of them.
+    """
+    keys = set()
+    for node in ast.walk(_source(func)):
+        if isinstance(node, ast.Subscript) and _element(node.value, names):
+            keys.add(_key(node))
+        elif (isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and
+              node.func.attr == 'get' and _element(node.func.value, names) and node.args and
+              isinstance(node.args[0], ast.Constant)):
+            keys.add(node.args[0].value)
+        elif isinstance(node, ast.Compare) and isinstance(node.ops[0], (ast.In, ast.NotIn)):
+            if (_element(node.comparators[0], names) and isinstance(node.left, ast.Constant)):
+                keys.add(node.left.value)
+    keys.discard(None)
+    return keys
+
+
+EXTRACTORS = (datahelper._gather_media_type, datahelper._gather_info, datahelper._gather_art)
+
+
+def _method(name):
+    return getattr(main.KodiMediaset, '_KodiMediaset' + name if name.startswith('__') else name)
+
+
+def test_extractor_keys_are_projected():
+    keys = set().union(*(read_keys(f) for f in EXTRACTORS))
+    assert keys - set(FEED_FIELDS['programs']) - UNPROJECTED == set()
+
+
+def test_listing_keys_are_projected():
+    # programs, sections and seasons go through __analizza_elenco
+    keys = read_keys(_method('__analizza_elenco'))
+    keys |= read_keys(_method('elenco_stagioni_list'), ('els',))
+    keys |= read_keys(_method('elenco_sezioni_list'), ('els',))
+    for kind in ('programs', 'brands', 'seasons'):
+        assert keys - set(FEED_FIELDS[kind]) - UNPROJECTED == set(), kind
+
+
+def test_station_keys_are_projected():
+    keys = set().union(*(read_keys(f) for f in EXTRACTORS))
+    keys |= read_keys(_method('canali_live_root'))
+    keys |= read_keys(_method('guida_tv_root'))
+    assert keys - set(FEED_FIELDS['stations']) - UNPROJECTED == set()
+
+
+def test_guid_keys_are_projected():
+    assert read_keys(_method('riproduci_guid'), ('res',)) <= set(FEED_FIELDS['guid'])
+
+
+def test_projection_keeps_infos_and_arts():
+    for prog in (fixtures.program(7), fixtures.series(3), fixtures.season(1, 'S1'),
+                 fixtures.station(2)):
+        projected = {k: v for k, v in prog.items() if k in FEED_FIELDS['stations']}
+        assert datahelper._gather_info(projected) == datahelper._gather_info(prog)
+        assert datahelper._gather_info(projected, titlewd=True) == \
+            datahelper._gather_info(prog, titlewd=True)
+        assert datahelper._gather_art(projected) == datahelper._gather_art(prog)
+
+
+def test_read_keys_finds_every_kind_of_read():
+    def sample(prog, els):
+        if 'a' in prog and prog.get('b'):
+            return prog['c'], els[0]['d'], prog['e']['nested']
+    assert read_keys(sample, ('prog', 'els')) == {'a', 'b', 'c', 'd', 'e'}
@@ -0,0 +1,69 @@
+import os
+import re
+import subprocess
+import sys
+
+from conftest import ROOT
+
+# microseconds resources.main may take to import, the menus without requests
+# pay only this; a few times what it takes on a desktop, to leave room for
+# slow machines but still catch a heavy module imported at the top
+BUDGET = 100000
+# modules loaded only by the views that use them
+LAZY = ('sqlite3', 'xml.etree.ElementTree', 'concurrent.futures')
+# the client and what it loads, the menus without requests don't need them
+CLIENT = ('resources.lib.mediaset', 'requests', 'sqlite3')
+# runs a view in a fresh interpreter and prints the modules it loaded
+VIEW = '''
+import sys, xbmcaddon
+xbmcaddon.PROFILE = sys.argv[2]
+sys.argv = ['plugin://plugin.video.videomediaset/', '1', sys.argv[1]]
+from resources.main import KodiMediaset
+KodiMediaset().main()
+print('\\n'.join(sys.modules))
+'''
+
+
+def _env():
+    return dict(os.environ, PYTHONPATH=os.pathsep.join((os.path.join(ROOT, 'tests', 'stubs'),
+                                                        ROOT)))
+
+
+def importtime(module):
+    """``{module: cumulative microseconds}`` of a fresh interpreter importing ``module``."""
+    res = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import ' + module],
+                         cwd=ROOT, env=_env(), stderr=subprocess.PIPE, universal_newlines=True,
+                         check=True)
+    times = {}
+    for cumulative, name in re.findall(r'^import time:\s+\d+ \|\s+(\d+) \| ( *\S+)$',
+                                       res.stderr, re.M):
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_main_import_within_budget():
+    best = min(importtime('resources.main')['resources.main'] for _ in range(3))
+    assert best < BUDGET
+
+
+def test_views_modules_are_lazy():
+    for module in ('resources.main', 'resources.lib.mediaset'):
+        times = importtime(module)
+        assert module in times
+        assert [m for m in LAZY if m in times] == [], module
+    assert 'resources.lib.mediaset' not in importtime('resources.main')
+
+
+def loaded(query, profile):
+    """Modules loaded by running the view of the plugin url query ``query``."""
+    res = subprocess.run([sys.executable, '-c', VIEW, query, str(profile)], cwd=ROOT,
+                         env=_env(), stdout=subprocess.PIPE, universal_newlines=True, check=True)
+    return set(res.stdout.split())
+
+
+def test_menus_without_requests_dont_load_the_client(tmp_path):
+    for query in ('', '?mode=cerca', '?mode=tutto', '?mode=tutto&all=true',
+                  '?mode=tutto&all=false'):
+        modules = loaded(query, tmp_path)
+        assert 'resources.main' in modules
+        assert [m for m in CLIENT if m in modules] == [], query
@@ -0,0 +1,68 @@
+import sys
+import threading
+import time
+import types
+
+import xbmc
+import xbmcaddon
+import xbmcplugin
+from phate89lib import kodiutils, rutils
+from benchmarks import run
+from benchmarks.stubserver import StubServer
+from resources.main import KodiMediaset
+
+
+def _settings(monkeypatch, tmp_path):
+    monkeypatch.setattr(xbmcaddon, 'PROFILE', str(tmp_path))
+    monkeypatch.setitem(kodiutils.SETTINGS, 'prefetch', 'true')
+    monkeypatch.setitem(kodiutils.SETTINGS, 'cachesize', '50')
+
+
+def _plugin(func, monkeypatch, tmp_path):
+    _settings(monkeypatch, tmp_path)
+    plugin = KodiMediaset()
+    plugin._KodiMediaset__med = types.SimpleNamespace(serveStale=True)
+    plugin._KodiMediaset__successiva = (func, (), {})
+    return plugin
+
+
+def test_prefetch_runs_after_the_listing_is_handed_over(monkeypatch, tmp_path):
+    # kodi updates the folder path only after endOfDirectory returned
+    monkeypatch.setitem(xbmc.LABELS, 'Container.FolderPath',
+                        'plugin://plugin.video.videomediaset/?mode=other')
+    called = []
+    _plugin(lambda: called.append(True), monkeypatch, tmp_path)._KodiMediaset__scarica_successiva()
+    assert called == [True]
+
+
+def test_prefetch_stops_waiting_when_kodi_closes(monkeypatch, tmp_path):
+    monkeypatch.setattr(xbmc.Monitor, 'aborted', False)
+    done = threading.Event()
+
+    def slow():
+        time.sleep(1)
+        done.set()
+
+    threading.Timer(0.1, setattr, (xbmc.Monitor, 'aborted', True)).start()
+    start = time.time()
+    _plugin(slow, monkeypatch, tmp_path)._KodiMediaset__scarica_successiva()
+    assert time.time() - start < 0.5
+    assert not done.is_set()
+
+
+def test_next_page_of_a_section_comes_from_the_cache(monkeypatch, tmp_path):
+    _settings(monkeypatch, tmp_path)
+    monkeypatch.setitem(kodiutils.SETTINGS, 'itemsperpage', '5')
+    monkeypatch.setattr(rutils.RUtils, 'SESSION', rutils.requests.Session())
+    monkeypatch.setattr(sys, 'argv', sys.argv)
+    with StubServer() as server:
+        server.install(rutils.RUtils.SESSION)
+        pages = []
+        for page in ({}, {'page': '2'}, {'page': '3'}):
+            server.reset()
+            run.invoke(dict(page, mode='sezione', id='CWFILMACTION'))
+            pages.append((server.requests, [item.label for _, item, _ in xbmcplugin.ITEMS]))
+    # login, the page and the next one prefetched; then only the prefetch of the
+    # next page, the last page has none
+    assert [requests for requests, _ in pages] == [3, 1, 0]
+    assert pages[0][1] != pages[1][1] != pages[2][1]
@@ -0,0 +1,21 @@
+from benchmarks import items
+from resources.mediaset_datahelper import ProgramItem
+
+
+def test_every_way_gives_the_same_items():
+    progs = items.page(200)
+    shown = items.eager(progs)
+    assert len(shown) == 160
+    assert items.lazy(progs) == shown
+    assert items.tables(progs) == shown
+
+
+def test_skipped_items_gather_nothing():
+    item = ProgramItem(items.page(1)[0])
+    assert item._infos is None and item._arts is None
+    assert item.arts is item.arts
+
+
+def test_items_benchmark_runs(capsys):
+    items.main(['--items', '40', '--repeat', '1'])
+    assert len(capsys.readouterr().out.splitlines()) == 1 + len(items.WAYS)
@@ -0,0 +1,53 @@
+import os
+
+import xbmc
+import xbmcaddon
+from resources.lib.keystore import KeyStore
+from resources.service import EpgService
+
+URL = 'https://vod.mediaset.net/P1/0.mpd'
+
+
+def _service(monkeypatch, tmp_path):
+    monkeypatch.setattr(xbmcaddon, 'PROFILE', str(tmp_path))
+    monkeypatch.setattr(xbmc.Player, 'FILE', '')
+    store = KeyStore(os.path.join(str(tmp_path), 'playback.json'))
+    store.set('video', ['P1', False, URL], 3600)
+    return EpgService(), store
+
+
+def _play(player, file, fails):
+    xbmc.Player.FILE = file
+    player.onPlayBackStarted()
+    if fails:
+        xbmc.Player.FILE = ''
+        player.onPlayBackError()
+    else:
+        player.onAVStarted()
+
+
+def test_failure_of_our_video_forces_a_login(monkeypatch, tmp_path):
+    service, store = _service(monkeypatch, tmp_path)
+    # kodi keeps the headers of setResolvedUrl in the url
+    _play(service.player, URL + '|User-Agent=Mozilla', True)
+    assert store.get('failed') == 'P1'
+    assert store.get('video') is None
+
+
+def test_failure_of_another_addon_is_ignored(monkeypatch, tmp_path):
+    service, store = _service(monkeypatch, tmp_path)
+    _play(service.player, 'https://example.com/other.mp4', True)
+    assert store.get('failed') is None
+    assert store.get('video') == ['P1', False, URL]
+    # an error without a started file is not attributed either
+    service.player.onPlayBackError()
+    assert store.get('failed') is None
+
+
+def test_only_our_video_playing_clears_the_failure(monkeypatch, tmp_path):
+    service, store = _service(monkeypatch, tmp_path)
+    store.set('failed', 'P1', 3600)
+    _play(service.player, 'https://example.com/other.mp4', False)
+    assert store.get('failed') == 'P1'
+    _play(service.player, URL, False)
+    assert store.get('failed') is None
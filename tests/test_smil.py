@@ -0,0 +1,115 @@
+import os
+import sys
+import types
+
+import inputstreamhelper
+import xbmcaddon
+import xbmcplugin
+from phate89lib import kodiutils
+
+from benchmarks import smil as bench
+from resources.lib.keystore import KeyStore
+from resources.lib.smil import SMIL_NS, Candidate, SmilPolicy, pick, resolve
+from resources.main import KodiMediaset
+
+
+def _document(*refs):
+    return ('<smil xmlns="{}"><body><seq>{}</seq></body></smil>'.format(
+        SMIL_NS.strip('{}'), ''.join(
+            '<ref src="https://vod/{}" type="{}"{}/>'.format(
+                i, kind, ' security="commonEncryption"' if drm else '')
+            for i, (kind, drm) in enumerate(refs))))
+
+
+def test_protected_dash_beats_clear_hls():
+    best, _ = resolve(_document(('application/x-mpegURL', False),
+                                ('application/dash+xml', True)))
+    assert best.type == 'application/dash+xml' and best.security
+
+
+def test_clear_dash_beats_protected_dash_and_mp4():
+    best, candidates = resolve(_document(('application/dash+xml', True), ('video/mp4', False),
+                                         ('application/dash+xml', False),
+                                         ('application/dash+xml', False)))
+    assert best.url == 'https://vod/2' and not best.security
+    # nothing can beat it, the last stream isn't parsed
+    assert len(candidates) == 3
+
+
+def test_unknown_types_are_not_playable():
+    policy = SmilPolicy()
+    hls = Candidate('https://vod/0', 'application/x-mpegURL', False, '', 0, True)
+    assert not policy.playable(hls)
+    assert pick([hls], policy) is None
+
+
+def test_pick_among_candidates():
+    policy = SmilPolicy(types=('video/mp4',), max_height=720)
+    cands = [Candidate('https://vod/{}'.format(h), 'video/mp4', False, '', h, True)
+             for h in (1080, 720, 360)]
+    assert pick(cands, policy).url == 'https://vod/720'
+
+
+def test_early_exit_picks_like_a_full_parse():
+    policy = SmilPolicy()
+    for refs in (1, 7, 60):
+        for name, text in bench.documents(refs):
+            assert bench.early(text, policy) == bench.full(text, policy), (refs, name)
+
+
+def test_smil_benchmark_runs(capsys):
+    bench.main(['--refs', '30', '--repeat', '1'])
+    assert len(capsys.readouterr().out.splitlines()) == 4
+
+
+def _play(data, monkeypatch, tmp_path, inputstream=True, email=''):
+    monkeypatch.setattr(inputstreamhelper.Helper, 'check_inputstream', lambda self: inputstream)
+    monkeypatch.setitem(kodiutils.SETTINGS, 'email', email)
+    monkeypatch.setitem(kodiutils.SETTINGS, 'password', email)
+    monkeypatch.setattr(xbmcaddon, 'PROFILE', str(tmp_path))
+    monkeypatch.setattr(sys, 'argv', ['plugin://plugin.video.videomediaset/', '1', ''])
+    plugin = KodiMediaset()
+    plugin._KodiMediaset__med = types.SimpleNamespace(
+        OttieniDatiVideo=lambda pid, live: data, videoMaxHeight=720, apigw='',
+        login=lambda user, password: True, OttieniWidevineAuthUrl=lambda pid: 'https://lic')
+    xbmcplugin.reset()
+    plugin.riproduci_video('P1')
+    return xbmcplugin.RESOLVED[-1]
+
+
+def _data(best, *candidates):
+    cands = [Candidate('https://vod/{}'.format(i), kind, drm, 'P1', height, True)._asdict()
+             for i, (kind, drm, height) in enumerate(candidates)]
+    return dict(cands[best], candidates=cands)
+
+
+def test_hls_is_played_as_hls(monkeypatch, tmp_path):
+    solved, item = _play(_data(0, ('application/x-mpegURL', False, 720)), monkeypatch, tmp_path)
+    assert solved
+    assert item.properties['inputstream.adaptive.manifest_type'] == 'hls'
+
+
+def test_clear_mp4_without_inputstream(monkeypatch, tmp_path):
+    data = _data(3, ('application/dash+xml', True, 720), ('video/mp4', False, 1080),
+                 ('video/mp4', False, 360), ('application/dash+xml', False, 720))
+    solved, item = _play(data, monkeypatch, tmp_path, inputstream=False)
+    assert solved and item.path == 'https://vod/2'
+    assert 'inputstream' not in item.properties
+    # the service compares it with the file kodi fails to play
+    video = KeyStore(os.path.join(str(tmp_path), 'playback.json')).get('video')
+    assert video == ['P1', False, 'https://vod/2']
+
+
+def test_clear_mp4_without_login(monkeypatch, tmp_path):
+    data = _data(1, ('video/mp4', True, 720), ('application/dash+xml', True, 720),
+                 ('video/mp4', False, 1080))
+    # the clear mp4 is taller than the maximum height, still better than nothing
+    solved, item = _play(data, monkeypatch, tmp_path)
+    assert solved and item.path == 'https://vod/2'
+
+
+def test_no_clear_stream_without_login(monkeypatch, tmp_path):
+    data = _data(0, ('application/dash+xml', True, 720), ('video/mp4', True, 720))
+    solved, _ = _play(data, monkeypatch, tmp_path)
+    assert not solved
+    assert _play(data, monkeypatch, tmp_path, email='user@example.com')[0]